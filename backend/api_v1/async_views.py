@@ -0,0 +1,57 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def run_read_in_pool(view):
+    """
+    Переносит синхронное представление в пул потоков.
+    В Django 3.2 все thread_sensitive-вызовы одного воркера выполняются
+    в единственном потоке, поэтому чтение идет с thread_sensitive=False.
+    ORM работает целиком внутри вызова, а соединения потока
+    закрываются после ответа, как в конце обычного WSGI-запроса.
+    """
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def as_async_view(viewset, actions):
+    """
+    Асинхронный вариант маршрута вьюсета.
+    Чтение выполняется параллельно в пуле потоков, запись - в общем
+    потоке Django, как и остальные синхронные представления.
+    """
+    sync_view = viewset.as_view(actions)
+    read = run_read_in_pool(sync_view)
+    write = sync_to_async(sync_view, thread_sensitive=True)
+
+    async def view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    view.cls = viewset
+    view.initkwargs = sync_view.initkwargs
+    view.actions = actions
+    return view
+
+
+recipe_list = as_async_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+recipe_detail = as_async_view(
+    RecipeViewSet,
+    {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'},
+)
+tag_list = as_async_view(TagViewSet, {'get': 'list'})
+tag_detail = as_async_view(TagViewSet, {'get': 'retrieve'})
+ingredient_list = as_async_view(IngredientViewSet, {'get': 'list'})
+ingredient_detail = as_async_view(IngredientViewSet, {'get': 'retrieve'})
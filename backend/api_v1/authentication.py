@@ -0,0 +1,112 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import get_versions
+
+AUTH_VERSION_KEY = 'user:{}:auth'
+
+
+class TokenCache:
+    """
+    Ограниченный LRU-кэш токен -> пользователь в памяти процесса.
+    Запись живет не дольше TOKEN_CACHE_TTL и сбрасывается сменой
+    версии пользователя в общем кэше при выходе, удалении токена
+    или изменении пользователя, в том числе в других процессах.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is None:
+            return None
+        user, token, version, expires = entry
+        current = get_versions([AUTH_VERSION_KEY.format(user.pk)])
+        if time.monotonic() > expires or (
+            current[AUTH_VERSION_KEY.format(user.pk)] != version
+        ):
+            self.discard(key)
+            return None
+        return copy.copy(user), copy.copy(token)
+
+    def set(self, key, user, token):
+        version = get_versions(
+            [AUTH_VERSION_KEY.format(user.pk)]
+        )[AUTH_VERSION_KEY.format(user.pk)]
+        expires = time.monotonic() + settings.TOKEN_CACHE_TTL
+        with self.lock:
+            self.entries[key] = (
+                copy.copy(user), copy.copy(token), version, expires
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.entries),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+token_cache = TokenCache()
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который берет пользователя из token_cache
+    и обращается к БД только при промахе. Результат отмечается
+    в запросе для лога api_v1.requests.
+    """
+
+    def authenticate(self, request):
+        self.cache_hit = None
+        try:
+            return super().authenticate(request)
+        finally:
+            if self.cache_hit is not None:
+                request._request.token_cache_hit = self.cache_hit
+
+    def authenticate_credentials(self, key):
+        if settings.TOKEN_CACHE_SIZE:
+            cached = token_cache.get(key)
+            if cached is not None:
+                self.cache_hit = True
+                token_cache.record(hit=True)
+                return cached
+        user, token = super().authenticate_credentials(key)
+        if settings.TOKEN_CACHE_SIZE:
+            self.cache_hit = False
+            token_cache.record(hit=False)
+            token_cache.set(key, user, token)
+        return user, token
@@ -0,0 +1,356 @@
+import math
+import statistics
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscription
+
+from . import urls
+from .recipe_lists import add_recipes
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = 'synthetic_benchmark@example.com'
+BENCHMARK_PASSWORD = 'Kx7-pQ2-vL9-zR4'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+def percentile(values, share):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def get_url_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            names |= get_url_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class BenchmarkDataError(Exception):
+    """В базе нет данных для замера."""
+
+
+class ApiBenchmark:
+    """
+    Прогоняет все эндпоинты api_v1 через тестовый клиент и собирает
+    перцентили задержки, число SQL-запросов, статусы и размер ответов.
+    Данные готовит generate_load_data.
+    """
+
+    def __init__(self, only=None):
+        self.only = only
+        self.results = defaultdict(lambda: {
+            'latency_ms': [], 'queries': [], 'statuses': set(), 'bytes': []
+        })
+        self.url_names = set()
+
+    def run(self, iterations=30, warmup=3):
+        """Выполняет прогоны и возвращает отчет."""
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            self.prepare()
+            for _ in range(warmup):
+                self.run_iteration(record=False)
+            for _ in range(iterations):
+                self.run_iteration(record=True)
+        return {
+            'vendor': connection.vendor,
+            'iterations': iterations,
+            'endpoints': {
+                name: self.summarize(result)
+                for name, result in sorted(self.results.items())
+            },
+            'not_measured': sorted(
+                get_url_names(urls.urlpatterns) - self.url_names
+            ),
+        }
+
+    def prepare(self):
+        self.tag = Tag.objects.order_by('id').first()
+        self.ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)[:5]
+        )
+        self.author = User.objects.filter(
+            recipes__isnull=False
+        ).order_by('id').first()
+        if self.tag is None or self.author is None or not self.ingredients:
+            raise BenchmarkDataError(
+                'Нет данных для замера, выполните generate_load_data.'
+            )
+        self.user = User.objects.filter(email=BENCHMARK_EMAIL).first()
+        if self.user is None:
+            self.user = User.objects.create_user(
+                username='synthetic_benchmark',
+                email=BENCHMARK_EMAIL,
+                first_name='Замер',
+                last_name='Нагрузки',
+                password=BENCHMARK_PASSWORD,
+            )
+            self.fill_user_state()
+        self.followed_author = User.objects.filter(
+            recipes__isnull=False
+        ).exclude(id=self.user.id).exclude(
+            is_subscribed__user=self.user
+        ).order_by('id').first()
+        free_recipes = Recipe.objects.exclude(
+            is_favorited__user=self.user
+        ).exclude(is_in_shopping_cart__user=self.user).order_by('id')
+        self.recipe = free_recipes.first()
+        self.week_plan = list(free_recipes.values_list('id', flat=True)[1:8])
+        self.client = APIClient(raise_request_exception=False)
+        self.authenticate()
+        self.anonymous = APIClient(raise_request_exception=False)
+
+    def authenticate(self):
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def fill_user_state(self):
+        """Дает пользователю замера подписки, избранное и корзину."""
+        authors = User.objects.filter(
+            recipes__isnull=False
+        ).exclude(id=self.user.id).distinct().order_by('id')[:10]
+        for author in authors:
+            Subscription.objects.create(user=self.user, author=author)
+        recipe_ids = list(Recipe.objects.order_by('-pub_date').values_list(
+            'id', flat=True
+        )[:20])
+        add_recipes(Favourite, self.user, recipe_ids)
+        add_recipes(ShoppingCart, self.user, recipe_ids[:5])
+
+    def call(self, name, method, path, data=None, client=None, record=True):
+        client = client or self.client
+        if self.only and self.only not in name:
+            return None
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data, format='json')
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            elapsed = (time.perf_counter() - started) * 1000
+        if record:
+            self.url_names.add(resolve(path.split('?')[0]).url_name)
+            result = self.results[name]
+            result['latency_ms'].append(elapsed)
+            result['queries'].append(len(context))
+            result['statuses'].add(response.status_code)
+            result['bytes'].append(len(body))
+        return response
+
+    def run_iteration(self, record):
+        def call(*args, **kwargs):
+            return self.call(*args, record=record, **kwargs)
+
+        recipe_id = self.recipe.id
+        call('recipes-list', 'get', '/api/recipes/')
+        call(
+            'recipes-list-anonymous', 'get', '/api/recipes/',
+            client=self.anonymous,
+        )
+        call('recipes-list-cursor', 'get', '/api/recipes/?cursor=')
+        call(
+            'recipes-list-tag', 'get', f'/api/recipes/?tags={self.tag.slug}'
+        )
+        call(
+            'recipes-list-author', 'get',
+            f'/api/recipes/?author={self.author.id}',
+        )
+        call('recipes-list-favorited', 'get', '/api/recipes/?is_favorited=1')
+        call(
+            'recipes-list-shopping-cart', 'get',
+            '/api/recipes/?is_in_shopping_cart=1',
+        )
+        call('recipes-detail', 'get', f'/api/recipes/{recipe_id}/')
+        call(
+            'recipes-favorite-add', 'post',
+            f'/api/recipes/{recipe_id}/favorite/',
+        )
+        call(
+            'recipes-favorite-delete', 'delete',
+            f'/api/recipes/{recipe_id}/favorite/',
+        )
+        call(
+            'recipes-shopping-cart-add', 'post',
+            f'/api/recipes/{recipe_id}/shopping_cart/',
+        )
+        call(
+            'recipes-shopping-cart-delete', 'delete',
+            f'/api/recipes/{recipe_id}/shopping_cart/',
+        )
+        call(
+            'recipes-download-shopping-cart', 'get',
+            '/api/recipes/download_shopping_cart/',
+        )
+        call('recipes-cache-stats', 'get', '/api/recipes/cache_stats/')
+        call(
+            'recipes-cookable', 'get',
+            '/api/recipes/cookable/?' + '&'.join(
+                f'ingredients={ingredient_id}'
+                for ingredient_id in self.ingredients
+            ),
+        )
+        week_plan = {'recipes': self.week_plan}
+        call(
+            'recipes-favorite-bulk-add', 'post', '/api/recipes/favorite/',
+            week_plan,
+        )
+        call(
+            'recipes-favorite-bulk-delete', 'delete',
+            '/api/recipes/favorite/', week_plan,
+        )
+        call(
+            'recipes-shopping-cart-bulk-add', 'post',
+            '/api/recipes/shopping_cart/', week_plan,
+        )
+        call(
+            'recipes-shopping-cart-bulk-delete', 'delete',
+            '/api/recipes/shopping_cart/', week_plan,
+        )
+        cart = list(ShoppingCart.objects.filter(
+            user=self.user
+        ).values_list('recipe_id', flat=True))
+        call(
+            'recipes-shopping-cart-clear', 'delete',
+            '/api/recipes/shopping_cart/clear/',
+        )
+        if cart:
+            add_recipes(ShoppingCart, self.user, cart)
+
+        payload = {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in self.ingredients
+            ],
+            'tags': [self.tag.id],
+            'image': IMAGE,
+            'name': 'Рецепт замера',
+            'text': 'Создан benchmark_api.',
+            'cooking_time': 10,
+        }
+        response = call('recipes-create', 'post', '/api/recipes/', payload)
+        if response is not None and response.status_code == 201:
+            created_id = response.json()['id']
+            call(
+                'recipes-update', 'patch', f'/api/recipes/{created_id}/',
+                {**payload, 'name': 'Рецепт замера 2'},
+            )
+            call('recipes-delete', 'delete', f'/api/recipes/{created_id}/')
+
+        call('tags-list', 'get', '/api/tags/')
+        call('tags-detail', 'get', f'/api/tags/{self.tag.id}/')
+        call('ingredients-search', 'get', '/api/ingredients/?name=а')
+        call(
+            'ingredients-detail', 'get',
+            f'/api/ingredients/{self.ingredients[0]}/',
+        )
+
+        call('users-list', 'get', '/api/users/')
+        call('users-detail', 'get', f'/api/users/{self.author.id}/')
+        call('users-me', 'get', '/api/users/me/')
+        call(
+            'users-avatar-put', 'put', '/api/users/me/avatar/',
+            {'avatar': IMAGE},
+        )
+        call('users-avatar-delete', 'delete', '/api/users/me/avatar/')
+        call('users-subscriptions', 'get', '/api/users/subscriptions/')
+        call(
+            'users-subscriptions-limited', 'get',
+            '/api/users/subscriptions/?recipes_limit=3',
+        )
+        author_id = self.followed_author.id
+        call('users-subscribe', 'post', f'/api/users/{author_id}/subscribe/')
+        call(
+            'users-unsubscribe', 'delete', f'/api/users/{author_id}/subscribe/'
+        )
+        call(
+            'users-set-password', 'post', '/api/users/set_password/',
+            {
+                'current_password': BENCHMARK_PASSWORD,
+                'new_password': BENCHMARK_PASSWORD,
+            },
+        )
+
+        credentials = {
+            'email': BENCHMARK_EMAIL, 'password': BENCHMARK_PASSWORD
+        }
+        call(
+            'auth-token-login', 'post', '/api/auth/token/login/',
+            credentials, client=self.anonymous,
+        )
+        response = call(
+            'jwt-create', 'post', '/api/jwt/create/',
+            credentials, client=self.anonymous,
+        )
+        if response is not None and response.status_code == 200:
+            tokens = response.json()
+            call(
+                'jwt-refresh', 'post', '/api/jwt/refresh/',
+                {'refresh': tokens['refresh']}, client=self.anonymous,
+            )
+            call(
+                'jwt-verify', 'post', '/api/jwt/verify/',
+                {'token': tokens['access']}, client=self.anonymous,
+            )
+        # Выход удаляет общий токен пользователя, поэтому он последний.
+        call('auth-token-logout', 'post', '/api/auth/token/logout/')
+        self.authenticate()
+
+    def summarize(self, result):
+        latency = result['latency_ms']
+        return {
+            'requests': len(latency),
+            'statuses': sorted(result['statuses']),
+            'latency_ms': {
+                'mean': round(statistics.mean(latency), 3),
+                'p50': round(percentile(latency, 0.5), 3),
+                'p90': round(percentile(latency, 0.9), 3),
+                'p95': round(percentile(latency, 0.95), 3),
+                'p99': round(percentile(latency, 0.99), 3),
+                'max': round(max(latency), 3),
+            },
+            'queries': {
+                'min': min(result['queries']),
+                'max': max(result['queries']),
+            },
+            'response_bytes': round(statistics.mean(result['bytes'])),
+        }
+
+
+def format_report(report, baseline=None):
+    """Строки отчета, с baseline - со значениями предыдущего прогона."""
+    for name, result in report['endpoints'].items():
+        latency = result['latency_ms']
+        line = (
+            f'{name:34} {",".join(map(str, result["statuses"])):>8} '
+            f'p50 {latency["p50"]:8.2f} мс  p95 {latency["p95"]:8.2f} мс  '
+            f'запросов {result["queries"]["max"]:3}'
+        )
+        previous = (baseline or {}).get(name)
+        if previous:
+            line += (
+                f'  (было p50 {previous["latency_ms"]["p50"]:.2f} мс, '
+                f'запросов {previous["queries"]["max"]})'
+            )
+        yield line
+    if report['not_measured']:
+        yield 'Не замерялись: ' + ', '.join(report['not_measured'])
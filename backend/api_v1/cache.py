@@ -0,0 +1,146 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .compression import compress, negotiate_encoding
+from .renderers import FastJSONRenderer
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def get_state(namespace):
+    """
+    Возвращает версию и время последнего изменения данных пространства.
+    Версия входит в ключи ответов, поэтому ее смена сбрасывает их все.
+    """
+    cache = get_cache()
+    key = f'api:{namespace}:state'
+    state = cache.get(key)
+    if state is not None:
+        return state
+    cache.add(key, (time.time_ns(), int(time.time())), None)
+    return cache.get(key)
+
+
+def invalidate(namespace):
+    """Сбрасывает закэшированные ответы пространства."""
+    get_cache().set(
+        f'api:{namespace}:state', (time.time_ns(), int(time.time())), None
+    )
+
+
+def get_versions(keys):
+    """
+    Возвращает версии объектов по ключам.
+    Отсутствующие версии создаются заново, чтобы после вытеснения ключа
+    из кэша не подхватить устаревшие данные со старой версией.
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = {
+        key: time.time_ns() for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def bump_version(key):
+    """Меняет версию объекта после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: get_cache().set(key, time.time_ns(), None)
+    )
+
+
+def increment(key, delta=1):
+    """Увеличивает счетчик в кэше, создавая его при необходимости."""
+    if not delta:
+        return
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+class CachedResponseMixin:
+    """
+    Миксин для вьюсетов со справочными данными.
+    Хранит готовые байты JSON-ответов list и retrieve в кэше
+    и отвечает 304 на повторные запросы по ETag и Last-Modified.
+    """
+
+    cache_namespace = None
+    renderer_classes = (FastJSONRenderer,)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        version, last_modified = get_state(self.cache_namespace)
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = 'api:{}:{}:{}'.format(
+            self.cache_namespace,
+            version,
+            hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest(),
+        )
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = FastJSONRenderer().render(response.data)
+            entry = (quote_etag(hashlib.md5(body).hexdigest()), body)
+            cache.set(key, entry, settings.API_CACHE_TIMEOUT)
+        etag, body = entry
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = self.compressed_response(request, key, etag, body)
+        response.setdefault('ETag', etag)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def compressed_response(self, request, key, etag, body):
+        """Отдает тело, сжатое один раз на версию данных и кодировку."""
+        response = HttpResponse(body, content_type='application/json')
+        if len(body) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        cache = get_cache()
+        compressed = cache.get(f'{key}:{encoding}')
+        if compressed is None:
+            compressed = compress(body, encoding)
+            cache.set(
+                f'{key}:{encoding}', compressed, settings.API_CACHE_TIMEOUT
+            )
+        response.content = compressed
+        response['Content-Encoding'] = encoding
+        response['ETag'] = 'W/' + etag
+        return response
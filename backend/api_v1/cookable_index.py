@@ -0,0 +1,147 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from recipes.models import RecipeIngredient
+
+from .cache import get_cache, get_state, invalidate
+
+NAMESPACE = 'cookable'
+CHANGES_KEY = 'cookable:changes'
+CHANGE_KEY = 'cookable:change:{}'
+CHANGE_TIMEOUT = 24 * 60 * 60
+
+
+def record_change(recipe_id):
+    """
+    Записывает в журнал общего кэша, что ингредиенты рецепта изменились.
+    Вызывается после фиксации транзакции.
+    """
+    cache = get_cache()
+    cache.add(CHANGES_KEY, 0, None)
+    number = cache.incr(CHANGES_KEY)
+    cache.set(CHANGE_KEY.format(number), recipe_id, CHANGE_TIMEOUT)
+
+
+def reset():
+    """Заставляет все процессы заново построить индекс."""
+    invalidate(NAMESPACE)
+
+
+class CookableIndex:
+    """
+    Обратный индекс в памяти процесса для подбора рецептов по продуктам:
+    ингредиент -> отсортированный массив id рецептов и рецепт -> его
+    ингредиенты. Перед поиском процесс дочитывает журнал изменений
+    из общего кэша и пересобирает только измененные рецепты. Индекс
+    строится заново, если журнал отстал больше чем на
+    COOKABLE_INDEX_MAX_LAG записей, записи вытеснены или вызван reset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._recipes = None
+        self._state = None
+        self._applied = 0
+
+    def build(self):
+        postings = defaultdict(lambda: array('q'))
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.order_by(
+            'recipe_id'
+        ).values_list('recipe_id', 'ingredient_id').iterator():
+            if ingredient_id not in recipes[recipe_id]:
+                recipes[recipe_id].add(ingredient_id)
+                postings[ingredient_id].append(recipe_id)
+        return dict(postings), {
+            recipe_id: tuple(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+
+    def _sync(self):
+        cache = get_cache()
+        state = get_state(NAMESPACE)
+        applied = cache.get(CHANGES_KEY, 0)
+        if self._postings is None or state != self._state or (
+            applied - self._applied > settings.COOKABLE_INDEX_MAX_LAG
+        ):
+            self._postings, self._recipes = self.build()
+            self._state = state
+            self._applied = applied
+            return
+        if applied <= self._applied:
+            return
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self._applied + 1, applied + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            self._postings, self._recipes = self.build()
+        else:
+            self._apply(set(changes.values()))
+        self._state = state
+        self._applied = applied
+
+    def _apply(self, recipe_ids):
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self._recipes.pop(recipe_id, ()):
+                posting = self._postings[ingredient_id]
+                del posting[bisect_left(posting, recipe_id)]
+            if recipe_id not in ingredients:
+                continue
+            self._recipes[recipe_id] = tuple(ingredients[recipe_id])
+            for ingredient_id in ingredients[recipe_id]:
+                insort(
+                    self._postings.setdefault(ingredient_id, array('q')),
+                    recipe_id,
+                )
+
+    def match(self, ingredient_ids, max_missing=None):
+        """
+        Возвращает пары (id рецепта, число недостающих ингредиентов)
+        для рецептов, где есть хотя бы один из продуктов. Сначала идут
+        рецепты, которые можно приготовить полностью, затем по числу
+        недостающих ингредиентов, при равенстве - более новые.
+        """
+        with self._lock:
+            self._sync()
+            counts = Counter()
+            for ingredient_id in set(ingredient_ids):
+                counts.update(self._postings.get(ingredient_id, ()))
+            ranked = (
+                (len(self._recipes[recipe_id]) - have, -recipe_id)
+                for recipe_id, have in counts.items()
+            )
+            if max_missing is not None:
+                ranked = (
+                    item for item in ranked if item[0] <= max_missing
+                )
+            return [
+                (-recipe_id, missing) for missing, recipe_id in sorted(ranked)
+            ]
+
+    def missing(self, recipe_ids, ingredient_ids):
+        """Возвращает недостающие ингредиенты рецептов по их id."""
+        ingredient_ids = set(ingredient_ids)
+        with self._lock:
+            return {
+                recipe_id: [
+                    ingredient_id
+                    for ingredient_id in self._recipes.get(recipe_id, ())
+                    if ingredient_id not in ingredient_ids
+                ]
+                for recipe_id in recipe_ids
+            }
+
+
+cookable_index = CookableIndex()
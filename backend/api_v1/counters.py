@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favourite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+# Модель со счетчиком, поле счетчика, модель связи и ее внешний ключ.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favourite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def get_counters(source):
+    """Возвращает счетчики, которые зависят от записей модели source."""
+    return [
+        (model, field, foreign_key)
+        for model, field, counted, foreign_key in COUNTERS
+        if counted is source
+    ]
+
+
+def count_expression(source, foreign_key):
+    """Подзапрос с фактическим числом связанных записей объекта."""
+    return Coalesce(Subquery(
+        source.objects.filter(**{foreign_key: OuterRef('pk')}).order_by(
+        ).values(foreign_key).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def find_stale_counters():
+    """Возвращает число объектов с неверным значением каждого счетчика."""
+    return {
+        f'{model.__name__}.{field}': model.objects.annotate(
+            actual=count_expression(source, foreign_key)
+        ).exclude(**{field: F('actual')}).count()
+        for model, field, source, foreign_key in COUNTERS
+    }
+
+
+def reconcile_counters():
+    """
+    Пересчитывает расходящиеся счетчики из связей одним UPDATE
+    на каждый счетчик. Возвращает число исправленных объектов.
+    """
+    fixed = {}
+    with transaction.atomic():
+        for model, field, source, foreign_key in COUNTERS:
+            actual = count_expression(source, foreign_key)
+            stale = model.objects.annotate(actual=actual).exclude(
+                **{field: F('actual')}
+            ).values('pk')
+            fixed[f'{model.__name__}.{field}'] = model.objects.filter(
+                pk__in=stale
+            ).update(**{field: actual})
+    return fixed
@@ -4,6 +4,8 @@ from django_filters.rest_framework import FilterSet
 
 from recipes.models import Ingredient, Recipe, Tag
 
+from .recipe_search import search_recipes
+
 
 class FilterForIngredients(FilterSet):
     """Фильтр для поиска по названию ингредиента."""
@@ -33,18 +35,36 @@ class FilterForFavouritesAndShopingCard(FilterSet):
         method='shopping_card_filter'
     )
 
+    search = django_filters.filters.CharFilter(method='search_filter')
+
+    ordering = django_filters.filters.ChoiceFilter(
+        choices=(('popular', 'Сначала популярные'),),
+        method='ordering_filter',
+    )
+
     def favourited_filter(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(is_favorited__user=user)
+            return queryset.favorited_by(user)
         return queryset
 
     def shopping_card_filter(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(is_in_shopping_cart__user=user)
+            return queryset.in_shopping_cart_of(user)
         return queryset
 
+    def search_filter(self, queryset, name, value):
+        if value.strip():
+            return search_recipes(queryset, value)
+        return queryset
+
+    def ordering_filter(self, queryset, name, value):
+        return queryset.popular()
+
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+            'search', 'ordering',
+        )
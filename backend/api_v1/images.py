@@ -0,0 +1,260 @@
+import base64
+import binascii
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from django.db import close_old_connections, connections, transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from recipes.models import Recipe
+
+from . import cache
+from .recipe_cache import AUTHOR_VERSION_KEY, RECIPE_VERSION_KEY
+
+logger = logging.getLogger('api_v1.images')
+
+User = get_user_model()
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+VARIANT_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+DECODE_CHUNK_SIZE = 4 * 64 * 1024
+
+ImageSpec = namedtuple(
+    'ImageSpec', ('model', 'field', 'variants_field', 'sizes', 'version_key')
+)
+
+IMAGE_SPECS = {
+    'recipe': ImageSpec(
+        Recipe, 'image', 'image_variants',
+        {'detail': 1200, 'list': 480}, RECIPE_VERSION_KEY,
+    ),
+    'avatar': ImageSpec(
+        User, 'avatar', 'avatar_variants',
+        {'avatar': 160}, AUTHOR_VERSION_KEY,
+    ),
+}
+
+INVALID_IMAGE_MESSAGE = 'Загруженный файл не является корректным изображением.'
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    """
+    Временный файл декодированного изображения.
+    Хранилище перемещает его при сохранении, поэтому файл закрывается
+    явно, как загрузки из multipart при завершении запроса.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+def decode_base64_image(data):
+    """
+    Декодирует изображение из data URL частями во временный файл.
+    Размер проверяется по длине строки до декодирования, крупные файлы
+    пишутся на диск, как и обычные загрузки Django.
+    """
+    header, separator, payload = data.partition(';base64,')
+    if not separator or not payload:
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    size = len(payload) * 3 // 4 - payload[-2:].count('=')
+    check_size(size)
+
+    content_type = header[len('data:'):]
+    if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        upload = DecodedImageFile('temp', content_type, size, None)
+    else:
+        upload = InMemoryUploadedFile(
+            BytesIO(), None, 'temp', content_type, size, None
+        )
+    try:
+        for start in range(0, len(payload), DECODE_CHUNK_SIZE):
+            upload.file.write(base64.b64decode(
+                payload[start:start + DECODE_CHUNK_SIZE], validate=True
+            ))
+    except (binascii.Error, ValueError):
+        upload.close()
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    upload.file.seek(0)
+    return upload
+
+
+def check_size(size):
+    if size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise serializers.ValidationError(
+            'Размер изображения больше '
+            f'{settings.IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)} МБ.'
+        )
+
+
+def check_image(upload):
+    """
+    Проверяет размер файла, формат и число пикселей по заголовку
+    изображения, не декодируя его целиком. Возвращает формат.
+    """
+    check_size(upload.size)
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            image_format = image.format
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    finally:
+        upload.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError(
+            f'Формат {image_format} не поддерживается.'
+        )
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            f'Изображение {width}x{height} слишком большое.'
+        )
+    return image_format
+
+
+def variant_name(name, variant, variant_format):
+    """Имя копии до хэширования: каталог загрузок и расширение формата."""
+    return os.path.join(
+        name.split('/', 1)[0], 'variants',
+        f'{variant}.{VARIANT_EXTENSIONS[variant_format]}',
+    )
+
+
+def variant_urls(variants, request=None):
+    """Возвращает ссылки на готовые уменьшенные копии изображения."""
+    urls = {}
+    for variant, names in variants.items():
+        if variant == 'source':
+            continue
+        urls[variant] = {}
+        for variant_format, name in names.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant][variant_format] = url
+    return urls
+
+
+def needs_variants(instance, spec):
+    image = getattr(instance, spec.field)
+    variants = getattr(instance, spec.variants_field) or {}
+    return variants.get('source', '') != (image.name or '')
+
+
+def schedule_variants(spec_name, pk):
+    """Ставит построение копий в очередь после фиксации транзакции."""
+    transaction.on_commit(lambda: submit(spec_name, pk))
+
+
+def submit(spec_name, pk):
+    if settings.IMAGE_VARIANT_WORKERS == 0:
+        generate_variants(spec_name, pk)
+        return None
+    return get_executor().submit(run_in_worker, spec_name, pk)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    """Пул потоков обработки изображений, общий для процесса."""
+    return ThreadPoolExecutor(
+        max_workers=settings.IMAGE_VARIANT_WORKERS,
+        thread_name_prefix='image-variants',
+    )
+
+
+def run_in_worker(spec_name, pk, force=False):
+    close_old_connections()
+    try:
+        return generate_variants(spec_name, pk, force)
+    except Exception:
+        logger.exception('Не удалось обработать %s %s', spec_name, pk)
+        return None
+    finally:
+        connections.close_all()
+
+
+def generate_variants(spec_name, pk, force=False):
+    """
+    Строит копии изображения объекта во всех размерах и форматах.
+    Результат сохраняется, только если изображение не сменилось
+    за время обработки. Старые копии удаляет collect_media_garbage.
+    Возвращает словарь копий или None.
+    """
+    spec = IMAGE_SPECS[spec_name]
+    row = spec.model.objects.filter(pk=pk).values(
+        spec.field, spec.variants_field
+    ).first()
+    if row is None:
+        return None
+    name = row[spec.field] or ''
+    old_variants = row[spec.variants_field] or {}
+    if not force and old_variants.get('source', '') == name:
+        return old_variants
+
+    variants = {'source': name}
+    if name:
+        try:
+            variants.update(render_variants(name, spec.sizes))
+        except (OSError, Image.DecompressionBombError):
+            logger.warning('Не удалось прочитать изображение %s', name)
+            return None
+
+    updated = spec.model.objects.filter(
+        pk=pk, **{spec.field: name}
+    ).update(**{spec.variants_field: variants})
+    if not updated:
+        return None
+    cache.bump_version(spec.version_key.format(pk))
+    return variants
+
+
+def render_variants(name, sizes):
+    """Уменьшает изображение от большего размера к меньшему."""
+    variants = {}
+    with default_storage.open(name) as file, Image.open(file) as image:
+        largest = max(sizes.values())
+        image.draft('RGB', (largest, largest))
+        frame = ImageOps.exif_transpose(image)
+        has_alpha = frame.mode in ('RGBA', 'LA', 'PA') or (
+            frame.mode == 'P' and 'transparency' in frame.info
+        )
+        frame = frame.convert('RGBA' if has_alpha else 'RGB')
+        for variant, size in sorted(
+            sizes.items(), key=lambda item: item[1], reverse=True
+        ):
+            frame.thumbnail((size, size), Image.LANCZOS)
+            variants[variant] = {
+                variant_format: save_variant(
+                    frame, variant_name(name, variant, variant_format),
+                    variant_format,
+                )
+                for variant_format in VARIANT_FORMATS
+            }
+    return variants
+
+
+def save_variant(frame, name, variant_format):
+    if variant_format == 'jpeg' and frame.mode == 'RGBA':
+        background = Image.new('RGB', frame.size, (255, 255, 255))
+        background.paste(frame, mask=frame.getchannel('A'))
+        frame = background
+    buffer = BytesIO()
+    frame.save(
+        buffer, VARIANT_FORMATS[variant_format],
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        **({'progressive': True} if variant_format == 'jpeg' else {}),
+    )
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
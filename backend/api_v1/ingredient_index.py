@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+TRIGRAM_SIMILARITY_MIN = 0.5
+# В коротком запросе большая часть триграмм - с пробелами по краям,
+# и похожими оказываются все названия на те же буквы.
+TRIGRAM_QUERY_MIN_LENGTH = 4
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска: регистр, ё и пробелы."""
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+def trigrams(value):
+    """Возвращает множество триграмм строки по аналогии с pg_trgm."""
+    grams = set()
+    for word in value.split():
+        padded = f'  {word} '
+        grams.update(
+            padded[position:position + 3]
+            for position in range(len(padded) - 2)
+        )
+    return grams
+
+
+class IngredientSearchIndex:
+    """
+    Индекс ингредиентов в памяти процесса.
+    Поиск по префиксу идет бинарным поиском по отсортированным названиям,
+    поиск по вхождению и с опечатками - по триграммам.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._built_at = 0
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def build(self):
+        items = [
+            {
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            }
+            for ingredient_id, name, measurement_unit
+            in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        ]
+        items.sort(key=lambda item: (normalize(item['name']), item['id']))
+        names = [normalize(item['name']) for item in items]
+        grams = defaultdict(list)
+        for position, name in enumerate(names):
+            for gram in trigrams(name):
+                grams[gram].append(position)
+        return items, names, {
+            gram: tuple(positions) for gram, positions in grams.items()
+        }
+
+    def get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and not self._is_expired():
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._is_expired():
+                self._snapshot = self.build()
+                self._built_at = time.monotonic()
+            return self._snapshot
+
+    def _is_expired(self):
+        return (
+            self.ttl is not None
+            and time.monotonic() - self._built_at > self.ttl
+        )
+
+    def search(self, query, limit=None):
+        """
+        Ищет ингредиенты по названию.
+        Сначала идут совпадения по началу названия, затем по вхождению,
+        затем похожие названия по убыванию доли общих триграмм,
+        если запрос не короче TRIGRAM_QUERY_MIN_LENGTH символов.
+        """
+        items, names, grams = self.get_snapshot()
+        query = normalize(query)
+        if limit is None:
+            limit = len(items)
+        if not query:
+            return items[:limit]
+
+        found = []
+        seen = set()
+        position = bisect_left(names, query)
+        while (
+            position < len(names)
+            and names[position].startswith(query)
+            and len(found) < limit
+        ):
+            found.append(items[position])
+            seen.add(position)
+            position += 1
+        if len(found) >= limit:
+            return found
+
+        query_grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for position in grams.get(gram, ()):
+                if position not in seen:
+                    shared[position] += 1
+
+        fuzzy = len(query) >= TRIGRAM_QUERY_MIN_LENGTH
+        contains = []
+        similar = []
+        for position, count in shared.items():
+            if query in names[position]:
+                contains.append(position)
+                continue
+            if not fuzzy:
+                continue
+            similarity = count / len(query_grams)
+            if similarity >= TRIGRAM_SIMILARITY_MIN:
+                similar.append((-similarity, position))
+        contains.sort()
+        similar.sort()
+        found.extend(items[position] for position in contains)
+        found.extend(items[position] for _, position in similar)
+        return found[:limit]
+
+
+ingredient_index = IngredientSearchIndex(
+    ttl=getattr(settings, 'INGREDIENT_SEARCH_INDEX_TTL', None)
+)
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1.benchmark import ApiBenchmark, BenchmarkDataError, format_report
+
+
+class Command(BaseCommand):
+    """Класс для замера задержек и числа запросов к БД по эндпоинтам API."""
+
+    help = (
+        'Прогоняет все эндпоинты api_v1 через тестовый клиент и считает '
+        'перцентили задержки и число SQL-запросов. Данные готовит '
+        'generate_load_data. Отчеты двух прогонов можно сравнить через '
+        '--output и --compare. Тот же замер запускается из pytest: '
+        'pytest -m benchmark.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=30,
+            help='Сколько раз вызвать каждый эндпоинт.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Сколько прогонов выполнить без замера.',
+        )
+        parser.add_argument(
+            '--only',
+            help='Замерять только эндпоинты, в имени которых есть строка.',
+        )
+        parser.add_argument('--output', help='Сохранить отчет в JSON-файл.')
+        parser.add_argument(
+            '--compare',
+            help='JSON-отчет предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля.')
+        try:
+            report = ApiBenchmark(options['only']).run(
+                options['iterations'], options['warmup']
+            )
+        except BenchmarkDataError as error:
+            raise CommandError(error)
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['endpoints']
+        for line in format_report(report, baseline):
+            self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,121 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api_v1.compression import brotli, compress
+from api_v1.renderers import FastJSONRenderer, orjson
+from recipes.models import Recipe
+
+ENDPOINTS = {
+    'recipes-list': '/api/recipes/?limit={limit}',
+    'ingredients-list': '/api/ingredients/',
+}
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def cpu_ms(function, repeat):
+    """Среднее процессорное время вызова в миллисекундах."""
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return round((time.process_time() - started) * 1000 / repeat, 3)
+
+
+class Command(BaseCommand):
+    """Класс для замера размера ответов и затрат CPU на их подготовку."""
+
+    help = (
+        'Сравнивает для списка рецептов и ингредиентов время рендеринга '
+        'стандартным JSON-рендерером DRF и orjson, размер и время сжатия '
+        'gzip и brotli, а также размер ответа и CPU на весь запрос '
+        'при каждом Accept-Encoding.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--limit', type=int, default=24,
+            help='Размер страницы списка рецептов.',
+        )
+        parser.add_argument('--output', help='Сохранить отчет в JSON-файл.')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError(
+                'Нет рецептов для замера, выполните generate_load_data.'
+            )
+        repeat = options['repeat']
+        client = APIClient()
+        report = {
+            'orjson': orjson is not None,
+            'brotli': brotli is not None,
+            'endpoints': {},
+        }
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            for name, path in ENDPOINTS.items():
+                url = path.format(limit=options['limit'])
+                report['endpoints'][name] = self.measure(client, url, repeat)
+
+        for name, result in report['endpoints'].items():
+            self.stdout.write(f'{name}: {result["json_bytes"]} байт JSON')
+            for renderer, timing in result['render_cpu_ms'].items():
+                self.stdout.write(f'  рендеринг {renderer:<10} {timing} мс')
+            for encoding, stats in result['encodings'].items():
+                self.stdout.write(
+                    f'  {encoding:<8} {stats["wire_bytes"]:>9} байт  '
+                    f'сжатие {stats["compress_cpu_ms"]} мс  '
+                    f'запрос {stats["request_cpu_ms"]} мс CPU'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def measure(self, client, url, repeat):
+        response = client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        if response.status_code != 200:
+            raise CommandError(f'{url} ответил {response.status_code}.')
+        body = response.content
+        data = getattr(response, 'data', None)
+        if data is None:
+            data = json.loads(body)
+
+        result = {
+            'json_bytes': len(body),
+            'render_cpu_ms': {
+                'drf': cpu_ms(lambda: JSONRenderer().render(data), repeat),
+                'fast': cpu_ms(
+                    lambda: FastJSONRenderer().render(data), repeat
+                ),
+            },
+            'encodings': {},
+        }
+        for encoding in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            compress_cpu = 0.0
+            if encoding != 'identity':
+                compress_cpu = cpu_ms(
+                    lambda: compress(body, encoding), repeat
+                )
+            wire = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            if wire.get('Content-Encoding', 'identity') != encoding:
+                self.stderr.write(
+                    f'{url}: ожидали {encoding}, получили '
+                    f'{wire.get("Content-Encoding", "identity")}.'
+                )
+            result['encodings'][encoding] = {
+                'wire_bytes': len(wire.content),
+                'compress_cpu_ms': compress_cpu,
+                'request_cpu_ms': cpu_ms(
+                    lambda: client.get(url, HTTP_ACCEPT_ENCODING=encoding),
+                    repeat,
+                ),
+            }
+        return result
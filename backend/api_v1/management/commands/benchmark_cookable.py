@@ -0,0 +1,116 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q
+
+from api_v1 import cookable_index as index_module
+from api_v1.cookable_index import cookable_index
+from recipes.models import Ingredient, Recipe
+
+
+def sql_match(ingredient_ids, limit):
+    """Подбор рецептов агрегатом по RecipeIngredient на каждый запрос."""
+    queryset = Recipe.objects.annotate(
+        total=Count('recipeingredients'),
+        have=Count(
+            'recipeingredients',
+            filter=Q(recipeingredients__ingredient_id__in=ingredient_ids),
+        ),
+    ).filter(have__gt=0).annotate(
+        missing=F('total') - F('have')
+    ).order_by('missing', '-id')
+    return list(queryset.values_list('id', 'missing')[:limit])
+
+
+class Command(BaseCommand):
+    """Класс для сравнения подбора рецептов по продуктам с SQL-агрегатом."""
+
+    help = (
+        'Замеряет подбор рецептов по набору продуктов через обратный '
+        'индекс в памяти и через агрегат COUNT по RecipeIngredient, '
+        'а также построение индекса и применение журнала изменений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pantry', type=int, action='append', dest='pantries',
+            help='Размер набора продуктов, можно указать несколько раз.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Сохранить отчет в JSON-файл.')
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:100])
+        if not recipe_ids:
+            raise CommandError(
+                'Нет рецептов для замера, выполните generate_load_data.'
+            )
+        rng = random.Random(options['seed'])
+        ingredient_ids = list(
+            Ingredient.objects.filter(recipes__isnull=False).distinct(
+            ).values_list('id', flat=True)
+        )
+
+        index_module.reset()
+        started = time.perf_counter()
+        cookable_index.match(())
+        report = {
+            'recipes': Recipe.objects.count(),
+            'build_ms': round((time.perf_counter() - started) * 1000, 2),
+            'pantries': {},
+        }
+        for recipe_id in rng.sample(recipe_ids, min(50, len(recipe_ids))):
+            index_module.record_change(recipe_id)
+        started = time.perf_counter()
+        cookable_index.match(())
+        report['apply_50_changes_ms'] = round(
+            (time.perf_counter() - started) * 1000, 2
+        )
+        self.stdout.write(
+            f'Индекс построен за {report["build_ms"]} мс, 50 изменений '
+            f'применены за {report["apply_50_changes_ms"]} мс.'
+        )
+
+        for size in options['pantries'] or (5, 20, 50):
+            pantry = rng.sample(ingredient_ids, min(size, len(ingredient_ids)))
+            indexed = self.measure(
+                lambda: cookable_index.match(pantry)[:options['limit']],
+                options['repeat'],
+            )
+            naive = self.measure(
+                lambda: sql_match(pantry, options['limit']),
+                options['repeat'],
+            )
+            if indexed['result'] != naive['result']:
+                self.stderr.write(
+                    f'Набор из {size}: выдача индекса и SQL различается.'
+                )
+            report['pantries'][size] = {
+                'index_ms': indexed['median_ms'],
+                'sql_ms': naive['median_ms'],
+                'matches': len(cookable_index.match(pantry)),
+            }
+            self.stdout.write(
+                f'{size} продуктов: индекс {indexed["median_ms"]} мс, '
+                f'SQL {naive["median_ms"]} мс, '
+                f'рецептов {report["pantries"][size]["matches"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'median_ms': round(statistics.median(timings), 2),
+            'result': [tuple(item) for item in result],
+        }
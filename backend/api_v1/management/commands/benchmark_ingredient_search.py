@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1.filters import FilterForIngredients
+from api_v1.ingredient_index import IngredientSearchIndex
+from api_v1.serializers import IngredientSerializer
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    """Класс для сравнения поиска ингредиентов через ORM и через индекс."""
+
+    help = 'Сравнивает поиск ингредиентов через ORM и через индекс в памяти.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Количество поисковых запросов.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора запросов.',
+        )
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError(
+                'Нет ингредиентов, выполните load_fixture.'
+            )
+        rng = random.Random(options['seed'])
+        queries = [
+            rng.choice(names)[:rng.randint(1, 5)]
+            for _ in range(options['queries'])
+        ]
+
+        index = IngredientSearchIndex()
+        started = time.perf_counter()
+        index.get_snapshot()
+        build_time = time.perf_counter() - started
+
+        self.report('ORM (name__startswith)', queries, self.search_orm)
+        self.report('Индекс', queries, index.search)
+        self.stdout.write(f'Построение индекса: {build_time * 1000:.2f} мс')
+
+    def search_orm(self, query):
+        queryset = FilterForIngredients(
+            {'name': query}, queryset=Ingredient.objects.all()
+        ).qs
+        return IngredientSerializer(queryset, many=True).data
+
+    def report(self, title, queries, search):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{title}: запросов {len(timings)}, '
+            f'среднее {statistics.mean(timings):.3f} мс, '
+            f'медиана {statistics.median(timings):.3f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.3f} мс'
+        )
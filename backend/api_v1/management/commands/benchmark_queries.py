@@ -0,0 +1,277 @@
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from api_v1.filters import (FilterForFavouritesAndShopingCard,
+                            FilterForIngredients)
+from api_v1.shopping_list import get_shopping_list
+from api_v1.synthetic_data import clear_dataset, seed_dataset
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+PAGE_SIZE = 6
+
+
+class Command(BaseCommand):
+    """Класс для замера планов запросов API."""
+
+    help = (
+        'Выполняет запросы, которые делает API, и записывает '
+        'EXPLAIN ANALYZE для каждого. Для сравнения до и после миграции '
+        'сохраните отчет через --output и передайте его в --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--populate',
+            action='store_true',
+            help='Перед замером заполнить базу синтетическими данными.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Перед замером удалить синтетические данные.',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора данных.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько раз выполнять каждый запрос.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить отчет в JSON-файл.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON-отчет предыдущего запуска для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля.')
+        if options['clear']:
+            self.stdout.write(f'Удалено объектов: {clear_dataset()}')
+        if options['populate']:
+            started = time.perf_counter()
+            created = seed_dataset(
+                users=options['users'],
+                recipes=options['recipes'],
+                ingredients=options['ingredients'],
+                seed=options['seed'],
+            )
+            self.stdout.write(
+                f'Данные созданы за {time.perf_counter() - started:.1f} с: '
+                + ', '.join(f'{key} {value}' for key, value in created.items())
+            )
+
+        report = {
+            'vendor': connection.vendor,
+            'scenarios': {
+                name: self.measure(scenario, options['repeat'])
+                for name, scenario in self.get_scenarios().items()
+            },
+        }
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['scenarios']
+        self.print_report(report['scenarios'], baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def get_scenarios(self):
+        user = User.objects.filter(
+            subscriber__isnull=False,
+            shoppingcarts__isnull=False,
+        ).order_by('id').first()
+        recipe = Recipe.objects.order_by('id').first()
+        tag = Tag.objects.order_by('id').first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if None in (user, recipe, tag, ingredient):
+            raise CommandError(
+                'Недостаточно данных для замера, запустите с --populate.'
+            )
+        recipes = Recipe.objects.select_related('author').with_user_state(
+            user
+        )
+        total = Recipe.objects.count()
+        middle = recipes.order_by('-pub_date', '-id')[total // 2]
+        request = SimpleNamespace(user=user)
+
+        def filtered(params):
+            return FilterForFavouritesAndShopingCard(
+                params, queryset=recipes, request=request
+            ).qs
+
+        def subscriptions():
+            authors = list(User.objects.filter(
+                is_subscribed__user=user
+            )[:PAGE_SIZE])
+            list(Recipe.objects.latest_for_authors(
+                [author.id for author in authors], 3
+            ))
+
+        return {
+            'recipe_list': lambda: (
+                recipes.count(), list(recipes[:PAGE_SIZE])
+            ),
+            'recipe_list_deep_page': lambda: list(
+                recipes[total // 2:total // 2 + PAGE_SIZE]
+            ),
+            'recipe_list_cursor': lambda: list(recipes.filter(
+                Q(pub_date__lt=middle.pub_date)
+                | Q(pub_date=middle.pub_date, id__lt=middle.id)
+            ).order_by('-pub_date', '-id')[:PAGE_SIZE + 1]),
+            'recipe_list_by_tag': lambda: list(
+                filtered({'tags': [tag.slug]})[:PAGE_SIZE]
+            ),
+            'recipe_list_by_author': lambda: list(
+                filtered({'author': recipe.author_id})[:PAGE_SIZE]
+            ),
+            'recipe_list_popular': lambda: list(
+                filtered({'ordering': 'popular'})[:PAGE_SIZE]
+            ),
+            'recipe_list_favorited': lambda: list(
+                filtered({'is_favorited': 1})[:PAGE_SIZE]
+            ),
+            'recipe_list_in_shopping_cart': lambda: list(
+                filtered({'is_in_shopping_cart': 1})[:PAGE_SIZE]
+            ),
+            'recipe_detail': lambda: list(
+                Recipe.objects.with_related().with_user_state(user).filter(
+                    pk=recipe.pk
+                )
+            ),
+            'ingredient_prefix_search': lambda: list(FilterForIngredients(
+                {'name': ingredient.name[:2]},
+                queryset=Ingredient.objects.all(),
+            ).qs),
+            'subscriptions': subscriptions,
+            'shopping_list': lambda: list(get_shopping_list(user)),
+        }
+
+    def measure(self, scenario, repeat):
+        with CaptureQueriesContext(connection) as context:
+            scenario()
+        queries = []
+        for query in context.captured_queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                queries.append(self.explain(query['sql'], repeat))
+        return {
+            'queries': len(queries),
+            'time_ms': round(sum(query['time_ms'] for query in queries), 3),
+            'indexes': sorted({
+                index for query in queries for index in query['indexes']
+            }),
+            'full_scans': sorted({
+                table for query in queries for table in query['full_scans']
+            }),
+            'details': queries,
+        }
+
+    def explain(self, sql, repeat):
+        if connection.vendor == 'postgresql':
+            return self.explain_postgresql(sql, repeat)
+        return self.explain_generic(sql, repeat)
+
+    def explain_postgresql(self, sql, repeat):
+        timings = []
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                cursor.execute(
+                    f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}'
+                )
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                timings.append(
+                    plan[0]['Planning Time'] + plan[0]['Execution Time']
+                )
+        indexes, full_scans = set(), set()
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if 'Index Name' in node:
+                indexes.add(node['Index Name'])
+            if node['Node Type'] == 'Seq Scan':
+                full_scans.add(node['Relation Name'])
+            nodes.extend(node.get('Plans', ()))
+        return {
+            'sql': sql,
+            'time_ms': round(statistics.median(timings), 3),
+            'indexes': sorted(indexes),
+            'full_scans': sorted(full_scans),
+        }
+
+    def explain_generic(self, sql, repeat):
+        """
+        Для SQLite берет план из EXPLAIN QUERY PLAN,
+        а время замеряет выполнением самого запроса.
+        """
+        indexes, full_scans = set(), set()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            for row in cursor.fetchall():
+                detail = row[-1]
+                words = detail.split()
+                if ' INDEX ' in f' {detail} ':
+                    indexes.add(words[words.index('INDEX') + 1])
+                elif words[0] == 'SCAN' and len(words) > 1:
+                    full_scans.add(
+                        words[2] if words[1] == 'TABLE' else words[1]
+                    )
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'sql': sql,
+            'time_ms': round(statistics.median(timings), 3),
+            'indexes': sorted(indexes),
+            'full_scans': sorted(full_scans),
+        }
+
+    def print_report(self, scenarios, baseline):
+        for name, result in scenarios.items():
+            line = (
+                f'{name}: запросов {result["queries"]}, '
+                f'{result["time_ms"]:.3f} мс'
+            )
+            previous = (baseline or {}).get(name)
+            if previous:
+                line += f' (было {previous["time_ms"]:.3f} мс'
+                if result['time_ms']:
+                    line += (
+                        f', x{previous["time_ms"] / result["time_ms"]:.1f}'
+                    )
+                line += ')'
+            self.stdout.write(line)
+            if result['indexes']:
+                self.stdout.write(
+                    f'    индексы: {", ".join(result["indexes"])}'
+                )
+            if result['full_scans']:
+                self.stdout.write(self.style.WARNING(
+                    f'    полный просмотр: {", ".join(result["full_scans"])}'
+                ))
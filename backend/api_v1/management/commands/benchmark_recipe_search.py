@@ -0,0 +1,113 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from api_v1.recipe_search import recipe_search_index, search_recipes
+from recipes.models import Ingredient, Recipe
+
+DEFAULT_QUERIES = (
+    'суп',
+    'блины с сыром',
+    'грибами',
+    'запекайте в духовке',
+    'овощи',
+    'несуществующееслово',
+)
+
+
+def naive_search(queryset, query):
+    """Поиск по вхождению каждого слова без индекса, как было бы без него."""
+    for word in query.split():
+        queryset = queryset.filter(
+            Q(name__icontains=word)
+            | Q(text__icontains=word)
+            | Q(ingredients__name__icontains=word)
+        )
+    return queryset.distinct().order_by('-pub_date', '-id')
+
+
+class Command(BaseCommand):
+    """Класс для сравнения полнотекстового поиска рецептов с icontains."""
+
+    help = (
+        'Замеряет первую страницу и подсчет результатов поиска рецептов '
+        'через ?search= (tsvector в PostgreSQL или индекс в памяти) '
+        'и через наивный icontains по названию, описанию и ингредиентам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query', action='append', dest='queries',
+            help='Поисковый запрос, можно указать несколько раз.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--output', help='Сохранить отчет в JSON-файл.')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError(
+                'Нет рецептов для замера, выполните generate_load_data.'
+            )
+        queries = list(options['queries'] or DEFAULT_QUERIES)
+        if not options['queries']:
+            ingredient = Ingredient.objects.filter(
+                recipes__isnull=False
+            ).order_by('id').first()
+            if ingredient is not None:
+                queries.append(ingredient.name.split()[0])
+
+        report = {
+            'vendor': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'queries': {},
+        }
+        if connection.vendor != 'postgresql':
+            recipe_search_index.invalidate()
+            started = time.perf_counter()
+            recipe_search_index.get_postings()
+            report['index_build_ms'] = round(
+                (time.perf_counter() - started) * 1000, 2
+            )
+            self.stdout.write(
+                f'Индекс в памяти построен за {report["index_build_ms"]} мс.'
+            )
+
+        for query in queries:
+            result = {
+                'naive': self.measure(
+                    lambda: naive_search(Recipe.objects.all(), query),
+                    options,
+                ),
+                'indexed': self.measure(
+                    lambda: search_recipes(Recipe.objects.all(), query),
+                    options,
+                ),
+            }
+            report['queries'][query] = result
+            self.stdout.write(
+                f'{query!r}: icontains {result["naive"]["median_ms"]} мс '
+                f'({result["naive"]["matches"]} шт.), '
+                f'индекс {result["indexed"]["median_ms"]} мс '
+                f'({result["indexed"]["matches"]} шт.)'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def measure(self, build_queryset, options):
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            queryset = build_queryset()
+            list(queryset[:options['limit']])
+            matches = queryset.count()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'median_ms': round(statistics.median(timings), 2),
+            'matches': matches,
+        }
@@ -0,0 +1,195 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1.management.commands.benchmark_api import percentile
+from recipes.models import Recipe
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe_id}/',
+    '/api/tags/',
+    '/api/ingredients/?name=%D0%B0',
+)
+
+
+class Command(BaseCommand):
+    """Класс для сравнения пропускной способности WSGI и ASGI."""
+
+    help = (
+        'Запускает gunicorn в режимах WSGI и ASGI (воркеры uvicorn) '
+        'и сравнивает пропускную способность при параллельных запросах. '
+        'Можно указать уже запущенные серверы через --wsgi-url и --asgi-url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', nargs='+', default=('wsgi', 'asgi'),
+            choices=('wsgi', 'asgi'),
+        )
+        parser.add_argument(
+            '--concurrency', nargs='+', type=int, default=(1, 8, 32),
+            help='Уровни параллельности.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый уровень параллельности.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Количество воркеров gunicorn.',
+        )
+        parser.add_argument('--port', type=int, default=8901)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Сколько медленных клиентов держат соединения во время '
+                 'замера, не дописывая заголовки запроса.',
+        )
+        parser.add_argument('--wsgi-url', help='Адрес запущенного WSGI.')
+        parser.add_argument('--asgi-url', help='Адрес запущенного ASGI.')
+        parser.add_argument('--output', help='Сохранить отчет в JSON-файл.')
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by('id').first()
+        if recipe is None:
+            raise CommandError(
+                'Нет рецептов для замера, выполните generate_load_data.'
+            )
+        self.paths = [
+            path.format(recipe_id=recipe.id) for path in DEFAULT_PATHS
+        ]
+        self.host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        )
+
+        report = {}
+        for mode in options['modes']:
+            base_url = options[f'{mode}_url']
+            server = None
+            if base_url is None:
+                base_url = f'http://127.0.0.1:{options["port"]}'
+                server = self.start_server(
+                    mode, options['port'], options['workers']
+                )
+            try:
+                self.wait_until_ready(base_url, server)
+                report[mode] = self.run_mode(mode, base_url, options)
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def start_server(self, mode, port, workers):
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'WEB_CONCURRENCY': str(workers),
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'REQUEST_LOG_LEVEL': 'WARNING',
+        }
+        return subprocess.Popen(
+            (sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'),
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def wait_until_ready(self, base_url, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске.')
+            try:
+                self.fetch(base_url + '/api/tags/')
+                return
+            except (URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Сервер {base_url} не ответил за {timeout} с.')
+
+    def fetch(self, url):
+        request = urllib.request.Request(url, headers={'Host': self.host})
+        started = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+        return time.perf_counter() - started
+
+    def open_slow_clients(self, base_url, count):
+        host, port = base_url.split('//')[1].split(':')
+        clients = []
+        for _ in range(count):
+            client = socket.create_connection((host, int(port)))
+            client.sendall(
+                f'GET /api/tags/ HTTP/1.1\r\nHost: {self.host}\r\n'.encode()
+            )
+            clients.append(client)
+        return clients
+
+    def run_mode(self, mode, base_url, options):
+        slow_clients = self.open_slow_clients(
+            base_url, options['slow_clients']
+        )
+        results = {}
+        try:
+            for concurrency in options['concurrency']:
+                results[concurrency] = self.run_level(
+                    base_url, concurrency, options['requests']
+                )
+                result = results[concurrency]
+                self.stdout.write(
+                    f'{mode} c={concurrency:<3} '
+                    f'{result["throughput_rps"]:8.1f} запр/с  '
+                    f'p50 {result["p50_ms"]:8.2f} мс  '
+                    f'p95 {result["p95_ms"]:8.2f} мс  '
+                    f'ошибок {result["errors"]}'
+                )
+        finally:
+            for client in slow_clients:
+                client.close()
+        return results
+
+    def run_level(self, base_url, concurrency, total):
+        urls = [
+            base_url + self.paths[number % len(self.paths)]
+            for number in range(total)
+        ]
+
+        def safe_fetch(url):
+            try:
+                return self.fetch(url)
+            except (URLError, ConnectionError, socket.timeout):
+                return None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(safe_fetch, urls))
+        elapsed = time.perf_counter() - started
+        latencies = [timing * 1000 for timing in timings if timing is not None]
+        if not latencies:
+            raise CommandError(
+                f'Все запросы к {base_url} завершились ошибкой.'
+            )
+        return {
+            'requests': total,
+            'errors': total - len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api_v1.images import IMAGE_SPECS
+
+
+class Command(BaseCommand):
+    """Класс для удаления медиафайлов, на которые нет ссылок."""
+
+    help = (
+        'Удаляет из каталогов фото рецептов и аватаров файлы, на которые '
+        'не ссылаются ни изображения, ни их уменьшенные копии. '
+        'Свежие файлы не трогает: их может использовать еще '
+        'не зафиксированная транзакция.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Минимальный возраст удаляемого файла в секундах.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        directories = set()
+        for spec in IMAGE_SPECS.values():
+            field = spec.model._meta.get_field(spec.field)
+            directories.add(field.upload_to)
+            rows = spec.model.objects.order_by().values_list(
+                spec.field, spec.variants_field
+            )
+            for name, variants in rows.iterator():
+                referenced.add(name)
+                for variant, names in (variants or {}).items():
+                    if variant != 'source':
+                        referenced.update(names.values())
+
+        deadline = time.time() - options['min_age']
+        removed = freed = 0
+        for directory in sorted(directories):
+            for name in self.walk(directory):
+                if name in referenced:
+                    continue
+                path = default_storage.path(name)
+                if os.path.getmtime(path) > deadline:
+                    continue
+                removed += 1
+                freed += os.path.getsize(path)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{action} файлов: {removed}, {freed / 1024 / 1024:.1f} МБ.'
+        )
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        subdirectories, files = default_storage.listdir(directory)
+        for filename in files:
+            yield os.path.join(directory, filename)
+        for subdirectory in subdirectories:
+            yield from self.walk(os.path.join(directory, subdirectory))
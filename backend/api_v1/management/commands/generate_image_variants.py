@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api_v1.images import IMAGE_SPECS, run_in_worker
+
+
+class Command(BaseCommand):
+    """Класс для построения копий уже загруженных изображений."""
+
+    help = (
+        'Строит уменьшенные копии WebP и JPEG для фото рецептов '
+        'и аватаров, у которых их еще нет или они устарели.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', choices=tuple(IMAGE_SPECS), nargs='+',
+            default=tuple(IMAGE_SPECS),
+            help='Какие изображения обрабатывать.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить копии, даже если они актуальны.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков обработки.',
+        )
+
+    def handle(self, *args, **options):
+        for spec_name in options['only']:
+            spec = IMAGE_SPECS[spec_name]
+            rows = spec.model.objects.exclude(
+                **{spec.field: ''}
+            ).order_by('pk').values_list(
+                'pk', spec.field, spec.variants_field
+            )
+            pks = [
+                pk for pk, name, variants in rows.iterator()
+                if options['force'] or (variants or {}).get('source') != name
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(
+                    lambda pk: run_in_worker(spec_name, pk, options['force']),
+                    pks,
+                ))
+            failed = results.count(None)
+            self.stdout.write(
+                f'{spec_name}: обработано {len(pks) - failed}, '
+                f'ошибок {failed} за '
+                f'{time.perf_counter() - started:.1f} с.'
+            )
@@ -0,0 +1,103 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1 import cache, cookable_index
+from api_v1.counters import reconcile_counters
+from api_v1.ingredient_index import ingredient_index
+from api_v1.recipe_search import update_search_vectors
+from api_v1.synthetic_data import clear_dataset, seed_dataset
+
+
+class Command(BaseCommand):
+    """Класс для генерации синтетических данных."""
+
+    help = (
+        'Создает пользователей, рецепты, избранное, корзины и подписки '
+        'пакетными INSERT для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=0,
+            help='Сколько ингредиентов создать. '
+                 'При 0 используются загруженные через load_fixture.',
+        )
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=10,
+            help='Сколько тегов создать. При 0 используются существующие.',
+        )
+        parser.add_argument(
+            '--favorites-per-user',
+            type=int,
+            default=20,
+            help='Среднее число рецептов в избранном пользователя.',
+        )
+        parser.add_argument(
+            '--carts-per-user',
+            type=int,
+            default=3,
+            help='Среднее число рецептов в корзине пользователя.',
+        )
+        parser.add_argument(
+            '--subscriptions-per-user',
+            type=int,
+            default=10,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора данных.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество записей в одном INSERT.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Сначала удалить ранее созданные синтетические данные.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if options['clear']:
+            self.stdout.write(f'Удалено объектов: {clear_dataset()}')
+
+        started = time.perf_counter()
+        try:
+            created = seed_dataset(
+                users=options['users'],
+                recipes=options['recipes'],
+                ingredients=options['ingredients'],
+                tags=options['tags'],
+                favorites_per_user=options['favorites_per_user'],
+                carts_per_user=options['carts_per_user'],
+                subscriptions_per_user=options['subscriptions_per_user'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        ingredient_index.invalidate()
+        update_search_vectors()
+        cookable_index.reset()
+        reconcile_counters()
+        for namespace in ('tags', 'ingredients'):
+            cache.invalidate(namespace)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.perf_counter() - started:.1f} с: '
+            + ', '.join(f'{key} {value}' for key, value in created.items())
+        ))
@@ -1,24 +1,154 @@
 import csv
+import json
+import time
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api_v1 import cache
+from api_v1.ingredient_index import ingredient_index
 from recipes.models import Ingredient
 
+DEFAULT_FIXTURE = Path(settings.BASE_DIR) / 'data' / 'ingredients.csv'
+JSON_READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по частям, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = file.read(JSON_READ_CHUNK_SIZE)
+        buffer = (buffer + chunk).lstrip()
+        if not started and buffer:
+            if not buffer.startswith('['):
+                raise CommandError('JSON-фикстура должна быть массивом.')
+            buffer = buffer[1:].lstrip()
+            started = True
+        while buffer:
+            if buffer[0] == ',':
+                buffer = buffer[1:].lstrip()
+                continue
+            if buffer[0] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Некорректный JSON в фикстуре.')
+                break
+            yield item['name'], item['measurement_unit']
+            buffer = buffer[end:].lstrip()
+        if not chunk:
+            return
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
     """Класс для импорта фикстур."""
 
+    help = 'Загружает ингредиенты из CSV или JSON пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=str(DEFAULT_FIXTURE),
+            help='Путь к файлу с ингредиентами (.csv или .json).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одном INSERT/UPDATE.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать изменения без записи в базу.',
+        )
+
     def handle(self, *args, **options):
-        self.load_fixture()
-        print('Загрузка завершена!')
-
-    def load_fixture(self, file='ingredients.csv'):
-        file_path = f'./data/{file}'
-        with open(file_path, newline='', encoding='utf-8') as i:
-            reader = csv.reader(i)
-
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        started = time.perf_counter()
+        rows_read, ingredients = self.read_fixture(Path(options['file']))
+        to_create, to_update, unchanged = self.diff(ingredients)
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                Ingredient.objects.bulk_create(
+                    to_create, batch_size=options['batch_size']
+                )
+                Ingredient.objects.bulk_update(
+                    to_update,
+                    ('measurement_unit',),
+                    batch_size=options['batch_size'],
+                )
+                transaction.on_commit(ingredient_index.invalidate)
+                transaction.on_commit(
+                    lambda: cache.invalidate('ingredients')
                 )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверка" if options["dry_run"] else "Загрузка"} завершена '
+            f'за {time.perf_counter() - started:.3f} с: '
+            f'прочитано строк {rows_read}, уникальных {len(ingredients)}, '
+            f'создано {len(to_create)}, обновлено {len(to_update)}, '
+            f'без изменений {unchanged}.'
+        ))
+
+    def read_fixture(self, file_path):
+        reader = READERS.get(file_path.suffix.lower())
+        if reader is None:
+            raise CommandError(
+                f'Неподдерживаемый формат файла: {file_path.suffix}.'
+            )
+        rows_read = 0
+        ingredients = {}
+        try:
+            with open(file_path, newline='', encoding='utf-8') as file:
+                for name, measurement_unit in reader(file):
+                    rows_read += 1
+                    name = name.strip()
+                    if name:
+                        ingredients.setdefault(name, measurement_unit.strip())
+        except FileNotFoundError:
+            raise CommandError(f'Файл {file_path} не найден.')
+        return rows_read, ingredients
+
+    def diff(self, ingredients):
+        existing = {}
+        for ingredient in Ingredient.objects.filter(
+            name__in=ingredients
+        ).order_by('id'):
+            existing.setdefault(ingredient.name, ingredient)
+
+        to_create, to_update = [], []
+        for name, measurement_unit in ingredients.items():
+            ingredient = existing.get(name)
+            if ingredient is None:
+                to_create.append(Ingredient(
+                    name=name, measurement_unit=measurement_unit
+                ))
+            elif ingredient.measurement_unit != measurement_unit:
+                ingredient.measurement_unit = measurement_unit
+                to_update.append(ingredient)
+        return (
+            to_create,
+            to_update,
+            len(ingredients) - len(to_create) - len(to_update),
+        )
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Класс для пересборки и проверки сводных списков покупок."""
+
+    help = 'Пересобирает сводные списки покупок из корзин пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, список которого нужно обработать.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить списки и вывести расхождения.',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            user = User.objects.filter(id=options['user']).first()
+            if user is None:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден.'
+                )
+
+        if options['check']:
+            self.check_consistency(user)
+            return
+
+        created = ShoppingListItem.objects.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(
+            f'Список покупок пересобран, записей: {created}.'
+        ))
+
+    def check_consistency(self, user):
+        mismatches = ShoppingListItem.objects.find_inconsistencies(user)
+        for user_id, ingredient_id, stored, expected in mismatches:
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'хранится {stored}, ожидается {expected}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Найдено расхождений: {len(mismatches)}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
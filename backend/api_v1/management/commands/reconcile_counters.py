@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1.counters import find_stale_counters, reconcile_counters
+
+
+class Command(BaseCommand):
+    """Класс для проверки и пересчета денормализованных счетчиков."""
+
+    help = (
+        'Сверяет счетчики избранного и корзин рецептов, рецептов '
+        'и подписчиков пользователей с таблицами связей и исправляет '
+        'расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счетчики и вывести расхождения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale = find_stale_counters()
+            for counter, total in stale.items():
+                self.stdout.write(f'{counter}: расхождений {total}')
+            if any(stale.values()):
+                raise CommandError(
+                    f'Найдено расхождений: {sum(stale.values())}.'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
+            return
+
+        for counter, total in reconcile_counters().items():
+            self.stdout.write(f'{counter}: исправлено {total}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,172 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from .authentication import token_cache
+from .recipe_cache import get_recipe_cache_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами в формате Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+class RouteMetrics:
+    """Метрики одного маршрута и HTTP-метода."""
+
+    def __init__(self):
+        self.statuses = defaultdict(int)
+        self.over_budget = 0
+        self.histograms = {
+            'duration_seconds': Histogram(DURATION_BUCKETS),
+            'db_duration_seconds': Histogram(DURATION_BUCKETS),
+            'serialize_duration_seconds': Histogram(DURATION_BUCKETS),
+            'queries': Histogram(QUERY_BUCKETS),
+            'response_size_bytes': Histogram(SIZE_BUCKETS),
+        }
+
+
+class RequestMetricsRegistry:
+    """
+    Агрегирует метрики запросов по маршрутам в памяти процесса.
+    При нескольких воркерах каждый отдает свои значения.
+    """
+
+    histogram_help = {
+        'duration_seconds': 'Время обработки запроса.',
+        'db_duration_seconds': 'Время выполнения SQL-запросов.',
+        'serialize_duration_seconds': 'Время рендеринга ответа.',
+        'queries': 'Количество SQL-запросов.',
+        'response_size_bytes': 'Размер ответа.',
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = defaultdict(RouteMetrics)
+
+    def observe(self, view, method, status, timings, over_budget):
+        with self.lock:
+            route = self.routes[view, method]
+            route.statuses[status] += 1
+            route.over_budget += over_budget
+            route.histograms['duration_seconds'].observe(timings['total'])
+            route.histograms['db_duration_seconds'].observe(timings['db'])
+            route.histograms['serialize_duration_seconds'].observe(
+                timings['serialize']
+            )
+            route.histograms['queries'].observe(timings['queries'])
+            if timings['size'] is not None:
+                route.histograms['response_size_bytes'].observe(
+                    timings['size']
+                )
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+    def render(self):
+        """Возвращает метрики в текстовом формате Prometheus."""
+        with self.lock:
+            routes = sorted(self.routes.items())
+            lines = [
+                '# HELP foodgram_http_requests_total Количество запросов.',
+                '# TYPE foodgram_http_requests_total counter',
+            ]
+            for (view, method), route in routes:
+                for status, count in sorted(route.statuses.items()):
+                    lines.append(
+                        'foodgram_http_requests_total'
+                        f'{labels(view=view, method=method, status=status)} '
+                        f'{count}'
+                    )
+            lines += [
+                '# HELP foodgram_http_requests_over_budget_total '
+                'Запросы, превысившие бюджет по времени или числу запросов.',
+                '# TYPE foodgram_http_requests_over_budget_total counter',
+            ]
+            for (view, method), route in routes:
+                lines.append(
+                    'foodgram_http_requests_over_budget_total'
+                    f'{labels(view=view, method=method)} {route.over_budget}'
+                )
+            for name, help_text in self.histogram_help.items():
+                metric = f'foodgram_http_request_{name}'
+                lines += [
+                    f'# HELP {metric} {help_text}',
+                    f'# TYPE {metric} histogram',
+                ]
+                for (view, method), route in routes:
+                    histogram = route.histograms[name]
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'{metric}_bucket'
+                            f'{labels(view=view, method=method, le=bound)} '
+                            f'{count}'
+                        )
+                    route_labels = labels(view=view, method=method)
+                    lines.append(f'{metric}_sum{route_labels} {histogram.sum}')
+                    lines.append(
+                        f'{metric}_count{route_labels} {histogram.count}'
+                    )
+
+        stats = get_recipe_cache_stats()
+        for name in ('hits', 'misses'):
+            metric = f'foodgram_recipe_cache_{name}_total'
+            lines += [
+                f'# HELP {metric} Обращения к кэшу представлений рецептов.',
+                f'# TYPE {metric} counter',
+                f'{metric} {stats[name]}',
+            ]
+        stats = token_cache.stats()
+        for name in ('hits', 'misses'):
+            metric = f'foodgram_token_cache_{name}_total'
+            lines += [
+                f'# HELP {metric} Проверки токенов через кэш процесса; '
+                'попадания - сэкономленные запросы к БД.',
+                f'# TYPE {metric} counter',
+                f'{metric} {stats[name]}',
+            ]
+        lines += [
+            '# HELP foodgram_token_cache_size Токенов в кэше процесса.',
+            '# TYPE foodgram_token_cache_size gauge',
+            f'foodgram_token_cache_size {stats["size"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = (
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+                '\n', '\\n'
+            ),
+        )
+        for key, value in values.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+request_metrics = RequestMetricsRegistry()
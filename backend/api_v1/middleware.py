@@ -0,0 +1,209 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .compression import compress, negotiate_encoding
+from .metrics import request_metrics
+
+logger = logging.getLogger('api_v1.requests')
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class QueryRecorder:
+    """Счетчик SQL-запросов и их времени для одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute-wrapper, который ставится на каждое соединение с БД.
+    Счетчик берется из контекста запроса, поэтому запросы учитываются
+    и в потоках sync_to_async при работе через ASGI.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.duration += time.perf_counter() - started
+        recorder.count += 1
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеряет для каждого запроса число SQL-запросов, время в БД,
+    время рендеринга ответа и его размер. Отдает их в заголовке
+    Server-Timing, пишет строкой JSON в лог api_v1.requests
+    и копит гистограммы по маршрутам для /api/metrics/.
+    У потоковых ответов учитывается работа до отдачи первого байта.
+    Работает и в синхронном, и в асинхронном режиме.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    def finish(self, request, response, recorder, started):
+        total = time.perf_counter() - started
+        serialize = 0.0
+        if hasattr(request, 'render_finished'):
+            serialize = request.render_finished - request.render_started
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        timings = {
+            'total': total,
+            'db': recorder.duration,
+            'serialize': serialize,
+            'queries': recorder.count,
+            'size': size,
+        }
+        over_budget = (
+            recorder.count > settings.REQUEST_QUERY_BUDGET
+            or total * 1000 > settings.REQUEST_TIME_BUDGET_MS
+        )
+        view = '<unresolved>'
+        if request.resolver_match is not None:
+            view = request.resolver_match.view_name
+        request_metrics.observe(
+            view, request.method, response.status_code, timings, over_budget
+        )
+
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.2f};'
+                f'desc="{recorder.count} queries", '
+                f'serialize;dur={serialize * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}'
+            )
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 2),
+                'db_ms': round(recorder.duration * 1000, 2),
+                'queries': recorder.count,
+                'serialize_ms': round(serialize * 1000, 2),
+                'size': size,
+                'over_budget': over_budget,
+                'token_cache_hit': getattr(request, 'token_cache_hit', None),
+            }),
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        request.render_started = time.perf_counter()
+
+        def finish(rendered):
+            request.render_finished = time.perf_counter()
+
+        response.add_post_render_callback(finish)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы больше COMPRESSION_MIN_SIZE в brotli или gzip
+    по заголовку Accept-Encoding, как GZipMiddleware Django.
+    Потоковые ответы сжимаются только gzip. Уже сжатые ответы,
+    например из кэша справочников, не трогает. В асинхронном режиме
+    сжимает сразу, без перехода в общий поток синхронного кода.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(
+            request, await self.get_response(request)
+        )
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+        if response.streaming:
+            if negotiate_encoding(accept_encoding, ('gzip',)) is None:
+                return response
+            response.streaming_content = compress_sequence(
+                response.streaming_content
+            )
+            del response['Content-Length']
+            encoding = 'gzip'
+        else:
+            encoding = negotiate_encoding(accept_encoding)
+            if encoding is None:
+                return response
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -1,5 +1,197 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+def approximate_count(queryset):
+    """
+    Оценивает количество строк по плану запроса в PostgreSQL.
+    Для остальных СУБД возвращает точное значение.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Пагинация ленты рецептов.
+    По умолчанию постраничная. С параметром ?cursor= включается
+    пагинация по ключу из полей сортировки выдачи, по умолчанию
+    (pub_date, id), без OFFSET и COUNT.
+    Параметр ?count=approx|none позволяет оценить или не считать
+    общее количество рецептов в постраничном режиме.
+    Размер страницы задается параметром ?limit=, как в CustomPagination.
+    """
+
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_modes = ('exact', 'approx', 'none')
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            return self.paginate_by_cursor(queryset, request)
+        self.mode = request.query_params.get(self.count_query_param, 'exact')
+        if self.mode not in self.count_modes:
+            raise ValidationError({self.count_query_param: (
+                f'Параметр {self.count_query_param} должен быть одним из: '
+                f'{", ".join(self.count_modes)}.'
+            )})
+        if self.mode == 'exact':
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_without_count(queryset, request)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'exact':
+            return super().get_paginated_response(data)
+        if self.mode == 'cursor':
+            return Response(OrderedDict([
+                ('next', self.next_link),
+                ('results', data),
+            ]))
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params[self.page_query_param],
+                message='',
+            ))
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=''
+            ))
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        url = request.build_absolute_uri()
+        self.next_link = None
+        if len(rows) > page_size:
+            self.next_link = replace_query_param(
+                url, self.page_query_param, page_number + 1
+            )
+        self.previous_link = None
+        if page_number > 1:
+            self.previous_link = replace_query_param(
+                url, self.page_query_param, page_number - 1
+            )
+        self.count = None
+        if self.mode == 'approx':
+            self.count = approximate_count(queryset)
+        return rows[:page_size]
+
+    def paginate_by_cursor(self, queryset, request):
+        page_size = self.get_page_size(request)
+        ordering = self.get_cursor_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(
+                self.after_key(ordering, self.decode_cursor(
+                    cursor, queryset.model, ordering
+                ))
+            )
+        rows = list(queryset[:page_size + 1])
+        self.next_link = None
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            url = remove_query_param(
+                request.build_absolute_uri(), self.page_query_param
+            )
+            self.next_link = replace_query_param(
+                url, self.cursor_query_param,
+                self.encode_cursor(last, ordering),
+            )
+        return rows[:page_size]
+
+    def get_cursor_ordering(self, queryset):
+        """
+        Ключ курсора - сортировка выдачи, заданная фильтрами, например
+        ?ordering=popular. Ключ должен состоять из полей модели без NULL,
+        поэтому сортировка по рангу поиска с курсором не сочетается.
+        """
+        ordering = list(queryset.query.order_by) or list(self.ordering)
+        fields = {
+            field.name: field for field in queryset.model._meta.concrete_fields
+        }
+        for term in ordering:
+            field = fields.get(str(term).lstrip('-'))
+            if field is None or field.null:
+                raise ValidationError({self.cursor_query_param: (
+                    'Пагинация по курсору не поддерживает эту сортировку, '
+                    'используйте постраничный режим.'
+                )})
+        if not any(term.lstrip('-') in ('id', 'pk') for term in ordering):
+            ordering.append('-id')
+        return ordering
+
+    def after_key(self, ordering, values):
+        """Условие на строки, идущие в сортировке после ключа values."""
+        condition = Q()
+        equal = Q()
+        for term, value in zip(ordering, values):
+            name = term.lstrip('-')
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, recipe, ordering):
+        payload = json.dumps(
+            [getattr(recipe, term.lstrip('-')) for term in ordering],
+            default=lambda value: value.isoformat(),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, model, ordering):
+        """
+        Разбирает значения ключа курсора. Курсор от другой сортировки
+        не подходит по числу или типам значений и отклоняется.
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(payload, list) or len(payload) != len(ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(term.lstrip('-')).to_python(value)
+                for term, value in zip(ordering, payload)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            values = None
+        if not values or None in values:
+            raise ValidationError(
+                {self.cursor_query_param: 'Неверный курсор.'}
+            )
+        return values
@@ -11,3 +11,12 @@ class IsAdminAuthorOrReadOnly(BasePermission):
             or obj.author == request.user
             or request.user.role == UserRole.ADMIN
         )
+
+
+class IsAdmin(BasePermission):
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.role == UserRole.ADMIN
+            or request.user.is_staff
+        )
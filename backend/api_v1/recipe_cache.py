@@ -0,0 +1,70 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+from recipes.models import get_recipe_prefetches
+
+from .cache import get_cache, get_state, get_versions, increment
+
+RECIPE_VERSION_KEY = 'recipe:{}:version'
+AUTHOR_VERSION_KEY = 'user:{}:version'
+HITS_KEY = 'recipe-cache:hits'
+MISSES_KEY = 'recipe-cache:misses'
+
+
+def get_recipe_representations(recipes, request, render):
+    """
+    Возвращает не зависящие от пользователя представления рецептов.
+    Ключ включает версии рецепта, его автора, справочников тегов и
+    ингредиентов и адрес сайта. Промахи рендерятся функцией render
+    после подгрузки тегов и ингредиентов только для них.
+    """
+    if not recipes:
+        return []
+    versions = get_versions(
+        [RECIPE_VERSION_KEY.format(recipe.pk) for recipe in recipes]
+        + [AUTHOR_VERSION_KEY.format(recipe.author_id) for recipe in recipes]
+    )
+    suffix = '{}:{}:{}'.format(
+        get_state('tags')[0],
+        get_state('ingredients')[0],
+        hashlib.md5(request.build_absolute_uri('/').encode()).hexdigest(),
+    )
+    keys = [
+        'recipe:{}:{}:{}:{}'.format(
+            recipe.pk,
+            versions[RECIPE_VERSION_KEY.format(recipe.pk)],
+            versions[AUTHOR_VERSION_KEY.format(recipe.author_id)],
+            suffix,
+        )
+        for recipe in recipes
+    ]
+    cache = get_cache()
+    cached = cache.get_many(keys)
+    misses = [
+        recipe for recipe, key in zip(recipes, keys) if key not in cached
+    ]
+    if misses:
+        prefetch_related_objects(misses, *get_recipe_prefetches())
+        fresh = {
+            key: render(recipe)
+            for recipe, key in zip(recipes, keys) if key not in cached
+        }
+        cache.set_many(fresh, settings.API_CACHE_TIMEOUT)
+        cached.update(fresh)
+    increment(HITS_KEY, len(recipes) - len(misses))
+    increment(MISSES_KEY, len(misses))
+    return [cached[key] for key in keys]
+
+
+def get_recipe_cache_stats():
+    """Возвращает счетчики попаданий и промахов кэша рецептов."""
+    counters = get_cache().get_many((HITS_KEY, MISSES_KEY))
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else None,
+    }
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from backend.counters import change_counter
+from recipes.models import Favourite, Recipe, ShoppingCart, ShoppingListItem
+
+User = get_user_model()
+
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+COUNTER_FIELDS = {
+    Favourite: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+
+
+def lock_user(user):
+    """
+    Блокирует строку пользователя до конца транзакции, чтобы
+    изменения его избранного и корзины шли по очереди.
+    """
+    list(User.objects.select_for_update().filter(pk=user.pk).values('pk'))
+
+
+def add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину одним bulk_create.
+    Сигналы post_save при этом не отправляются, поэтому счетчики
+    рецептов и список покупок обновляются здесь же.
+    Возвращает статус для каждого id: added, exists или not_found.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True)
+    )
+    with transaction.atomic():
+        lock_user(user)
+        existing = set(model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True))
+        added = [
+            pk for pk in recipe_ids if pk in found and pk not in existing
+        ]
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=pk) for pk in added],
+            ignore_conflicts=True,
+        )
+        change_counter(Recipe, added, COUNTER_FIELDS[model], 1)
+        if model is ShoppingCart:
+            ShoppingListItem.objects.add_recipes(user, added)
+    return {
+        pk: EXISTS if pk in existing else ADDED if pk in found else NOT_FOUND
+        for pk in recipe_ids
+    }
+
+
+def delete_entries(model, entries):
+    """
+    Удаляет записи избранного или корзины одним DELETE без выборки строк
+    и сигналов post_delete: счетчики рецептов уменьшаются здесь же одним
+    UPDATE, список покупок пересчитывает вызывающий код.
+    Возвращает id рецептов удаленных записей.
+    """
+    removed = list(entries.values_list('recipe_id', flat=True))
+    entries._raw_delete(entries.db)
+    change_counter(Recipe, removed, COUNTER_FIELDS[model], -1)
+    return removed
+
+
+def remove_recipes(model, user, recipe_ids):
+    """
+    Удаляет рецепты из избранного или корзины одним DELETE.
+    Счетчики рецептов и список покупок обновляются здесь же
+    одним запросом на все рецепты.
+    Возвращает статус для каждого id: removed или absent.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    with transaction.atomic():
+        lock_user(user)
+        removed = set(delete_entries(
+            model, model.objects.filter(user=user, recipe_id__in=recipe_ids)
+        ))
+        if model is ShoppingCart:
+            ShoppingListItem.objects.remove_recipes(user, removed)
+    return {
+        pk: REMOVED if pk in removed else ABSENT for pk in recipe_ids
+    }
+
+
+def clear_shopping_cart(user):
+    """Очищает корзину и список покупок пользователя."""
+    with transaction.atomic():
+        lock_user(user)
+        removed = delete_entries(
+            ShoppingCart, ShoppingCart.objects.filter(user=user)
+        )
+        ShoppingListItem.objects.filter(user=user).delete()
+    return len(removed)
@@ -0,0 +1,203 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import (Case, F, FloatField, OuterRef, Subquery, Value,
+                              When)
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, RecipeIngredient
+
+from .ingredient_index import normalize
+
+SEARCH_CONFIG = 'russian'
+# Веса полей как у ts_rank по умолчанию для A, B и C.
+FIELD_WEIGHTS = {'name': 1.0, 'text': 0.4, 'ingredients': 0.2}
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ий', 'ый', 'ом',
+    'ем', 'ам', 'ям', 'ах', 'ях', 'ую', 'юю', 'ов', 'ев', 'ью', 'ия',
+    'ья', 'ье', 'и', 'ы', 'а', 'я', 'о', 'е', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+STEM_LENGTH_MIN = 3
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'на', 'с', 'со', 'по', 'к', 'ко', 'о', 'об',
+    'от', 'до', 'для', 'из', 'у', 'за', 'без', 'или', 'а', 'но',
+))
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def is_postgresql(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def stem(word):
+    """Отрезает типичное окончание, как упрощенный стеммер Snowball."""
+    for ending in RUSSIAN_ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= STEM_LENGTH_MIN
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def terms(value):
+    return [
+        stem(word) for word in WORD_PATTERN.findall(normalize(value))
+        if word not in STOP_WORDS
+    ]
+
+
+def search_vector_expression():
+    """
+    Выражение tsvector рецепта: название с весом A, описание - B,
+    названия ингредиентов - C.
+    """
+    ingredient_names = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(ingredient_names), Value('')),
+            weight='C', config=SEARCH_CONFIG,
+        )
+    )
+
+
+def update_search_vectors(recipe_ids=None):
+    """
+    Пересчитывает search_vector одним UPDATE в PostgreSQL,
+    для остальных СУБД сбрасывает индекс в памяти процесса.
+    """
+    if not is_postgresql():
+        recipe_search_index.invalidate()
+        return
+    recipes = Recipe.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    recipes.update(search_vector=search_vector_expression())
+
+
+class RecipeSearchIndex:
+    """
+    Обратный индекс рецептов в памяти процесса для СУБД без
+    полнотекстового поиска. Для каждой основы слова хранит вес
+    лучшего поля рецепта, где она встречается.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._postings = None
+        self._built_at = 0
+
+    def invalidate(self):
+        self._postings = None
+
+    def build(self):
+        postings = defaultdict(dict)
+
+        def add(recipe_id, value, weight):
+            for term in terms(value):
+                if postings[term].get(recipe_id, 0) < weight:
+                    postings[term][recipe_id] = weight
+
+        for recipe_id, name, text in Recipe.objects.values_list(
+            'id', 'name', 'text'
+        ).iterator():
+            add(recipe_id, name, FIELD_WEIGHTS['name'])
+            add(recipe_id, text, FIELD_WEIGHTS['text'])
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient__name'
+        ).iterator():
+            add(recipe_id, name, FIELD_WEIGHTS['ingredients'])
+        return dict(postings)
+
+    def get_postings(self):
+        postings = self._postings
+        if postings is not None and not self._is_expired():
+            return postings
+        with self._lock:
+            if self._postings is None or self._is_expired():
+                self._postings = self.build()
+                self._built_at = time.monotonic()
+            return self._postings
+
+    def _is_expired(self):
+        return (
+            self.ttl is not None
+            and time.monotonic() - self._built_at > self.ttl
+        )
+
+    def search(self, query, limit):
+        """
+        Возвращает пары (id, ранг) рецептов, где есть все слова запроса.
+        Ранг - сумма весов полей, порядок - по убыванию ранга и id.
+        """
+        postings = self.get_postings()
+        query_terms = set(terms(query))
+        if not query_terms:
+            return []
+        matches = sorted(
+            (postings.get(term, {}) for term in query_terms), key=len
+        )
+        scores = dict(matches[0])
+        for posting in matches[1:]:
+            scores = {
+                recipe_id: score + posting[recipe_id]
+                for recipe_id, score in scores.items()
+                if recipe_id in posting
+            }
+        return sorted(
+            scores.items(), key=lambda item: (-item[1], -item[0])
+        )[:limit]
+
+
+recipe_search_index = RecipeSearchIndex(
+    ttl=getattr(settings, 'RECIPE_SEARCH_INDEX_TTL', None)
+)
+
+
+def search_recipes(queryset, query):
+    """
+    Фильтрует рецепты по словам запроса в названии, описании и
+    ингредиентах и сортирует по рангу. В PostgreSQL ищет по GIN-индексу
+    search_vector с русской морфологией, иначе - по индексу в памяти,
+    ограничивая выдачу RECIPE_SEARCH_FALLBACK_LIMIT рецептами.
+    """
+    if is_postgresql(queryset.db):
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    ranked = recipe_search_index.search(
+        query, settings.RECIPE_SEARCH_FALLBACK_LIMIT
+    )
+    if not ranked:
+        return queryset.none()
+    by_score = defaultdict(list)
+    for pk, score in ranked:
+        by_score[score].append(pk)
+    return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+        search_rank=Case(
+            *(
+                When(pk__in=pks, then=Value(score))
+                for score, pks in by_score.items()
+            ),
+            output_field=FloatField(),
+        )
+    ).order_by('-search_rank', '-id')
@@ -0,0 +1,68 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PlainTextRenderer(BaseRenderer):
+    """
+    Рендерер для выгрузки в текстовом формате.
+    Ошибки DRF приходят словарем: из них отдается текст detail,
+    остальные данные, например ошибки валидации, - в виде JSON.
+    """
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and set(data) == {'detail'}:
+            data = str(data['detail'])
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return JSONRenderer().render(data)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер для выгрузки в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PrometheusRenderer(PlainTextRenderer):
+    """
+    Рендерер метрик в текстовом формате Prometheus.
+    Версия формата указывается в Content-Type ответа, а не в media_type,
+    иначе DRF не сопоставит рендерер с заголовком Accept без параметров.
+    """
+
+    format = 'prometheus'
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson, без него - стандартный рендерер DRF.
+    Типы, которые orjson не знает (Decimal, ленивые строки), переводит
+    кодировщик DRF. Ответы с отступами отдает стандартный рендерер.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(
+            accepted_media_type or '', renderer_context or {}
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS,
+        )
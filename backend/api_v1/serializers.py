@@ -1,31 +1,68 @@
-import base64
+from collections import Counter
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
-from django.db.models import F
 
-from backend.constants import (RECIPE_INGREDIENT_AMOUNT_MAX,
+from backend.constants import (COOKABLE_INGREDIENTS_MAX,
+                               INGREDIENT_SEARCH_LIMIT_MAX, RECIPE_BULK_MAX,
+                               RECIPE_INGREDIENT_AMOUNT_MAX,
                                RECIPE_INGREDIENT_AMOUNT_MIN,
                                RECIPE_INGREDIENT_COOKING_TIME_MAX,
                                RECIPE_INGREDIENT_COOKING_TIME_MIN)
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem, Tag)
+from users.models import Subscription
+
+from .images import check_image, decode_base64_image, variant_urls
+from .recipe_cache import get_recipe_representations
+from .shopping_list import manual_totals
 
 User = get_user_model()
 
 
+def get_followed_author_ids(request):
+    """
+    Возвращает id авторов, на которых подписан текущий пользователь.
+    Загружается одним запросом при первом обращении и хранится в запросе,
+    поэтому общий для всех вложенных сериализаторов ответа.
+    """
+    if request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, 'followed_author_ids'):
+        request.followed_author_ids = frozenset(
+            Subscription.objects.filter(
+                user=request.user
+            ).order_by().values_list('author_id', flat=True)
+        )
+    return request.followed_author_ids
+
+
 class Base64ImageField(serializers.ImageField):
-    """Класс для обработки фото в base64."""
+    """
+    Класс для обработки фото в base64.
+    Размер, формат и число пикселей проверяются до полной
+    проверки изображения Pillow.
+    """
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = decode_base64_image(data)
+            data.name = 'temp.' + check_image(data).lower()
+        elif hasattr(data, 'size') and hasattr(data, 'seek'):
+            check_image(data)
         return super().to_internal_value(data)
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения по размерам и форматам."""
+
+    def to_representation(self, variants):
+        return variant_urls(variants or {}, self.context.get('request'))
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     """Сериализатор для регистрации пользователя."""
 
@@ -44,6 +81,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
 class CustomUserSerializer(UserSerializer):
     """Сериализатор для пользователя."""
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField()
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -55,22 +93,29 @@ class CustomUserSerializer(UserSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_variants',
             'is_subscribed',
         )
 
     def get_is_subscribed(self, author):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return user.is_subscribed.all().exists()
+        return author.id in get_followed_author_ids(self.context['request'])
+
+
+class SubscriptionParamsSerializer(serializers.Serializer):
+    """Сериализатор для параметров выдачи подписок."""
+
+    recipes_limit = serializers.IntegerField(required=False, min_value=0)
 
 
 class SubscriptionSerializer(UserSerializer):
-    """Сериализатор для подписки или отписки пользователей."""
+    """
+    Сериализатор для подписки или отписки пользователей.
+    Ожидает у автора список latest_recipes.
+    """
 
-    recipes_count = serializers.IntegerField(source="recipes.count")
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField(read_only=True)
+    avatar_variants = ImageVariantsField()
 
     class Meta(UserSerializer.Meta):
         model = User
@@ -82,23 +127,19 @@ class SubscriptionSerializer(UserSerializer):
             'email',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
             'recipes_count',
+            'subscribers_count',
             'recipes',
         )
 
     def get_recipes(self, author):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = author.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
-        return RecipeShortSerializer(recipes, many=True, read_only=True).data
+        return RecipeShortSerializer(
+            author.latest_recipes, many=True, read_only=True
+        ).data
 
     def get_is_subscribed(self, author):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return user.is_subscribed.all().exists()
+        return author.id in get_followed_author_ids(self.context['request'])
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -129,8 +170,58 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
+class IngredientSearchSerializer(serializers.Serializer):
+    """Сериализатор для параметров поиска ингредиентов."""
+
+    name = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        default='',
+        source='query',
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=INGREDIENT_SEARCH_LIMIT_MAX,
+    )
+
+
+class CookableParamsSerializer(serializers.Serializer):
+    """Сериализатор для параметров подбора рецептов по продуктам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=COOKABLE_INGREDIENTS_MAX,
+    )
+    max_missing = serializers.IntegerField(required=False, min_value=0)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор для списка id рецептов в пакетных операциях."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=RECIPE_BULK_MAX,
+    )
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Сериализатор списка рецептов с общим обращением к кэшу."""
+
+    def to_representation(self, data):
+        if isinstance(data, Manager):
+            data = data.all()
+        return self.child.represent(list(data))
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
-    """Сериализатор для чтения рецептов."""
+    """
+    Сериализатор для чтения рецептов.
+    Общая для всех пользователей часть берется из кэша,
+    флаги пользователя и счетчики добавляются при каждом ответе.
+    """
 
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
@@ -138,6 +229,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -151,30 +243,62 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
-            'cooking_time'
+            'cooking_time',
+            'favorites_count',
+            'carts_count',
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent([instance])[0]
+
+    def represent(self, recipes):
+        request = self.context['request']
+        followed = get_followed_author_ids(request)
+        representations = []
+        for recipe, cached in zip(recipes, get_recipe_representations(
+            recipes, request, super().to_representation
+        )):
+            data = dict(cached)
+            data['author'] = dict(
+                data['author'], is_subscribed=recipe.author_id in followed
+            )
+            data['is_favorited'] = self.get_is_favorited(recipe)
+            data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+            data['favorites_count'] = recipe.favorites_count
+            data['carts_count'] = recipe.carts_count
+            representations.append(data)
+        return representations
 
     def get_ingredients(self, obj):
-        recipe = obj
-        ingredients = recipe.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('recipeingredient__amount')
-        )
-        return ingredients
+        return [
+            {
+                'id': recipe_ingredient.ingredient.id,
+                'name': recipe_ingredient.ingredient.name,
+                'measurement_unit': (
+                    recipe_ingredient.ingredient.measurement_unit
+                ),
+                'amount': recipe_ingredient.amount,
+            }
+            for recipe_ingredient in obj.recipeingredients.all()
+        ]
 
     def get_is_favorited(self, recipe):
         user = self.context['request'].user
         if user.is_anonymous:
             return False
+        if hasattr(recipe, 'user_favorited'):
+            return recipe.user_favorited
         return user.favorites.filter(recipe=recipe).exists()
 
     def get_is_in_shopping_cart(self, recipe):
         user = self.context['request'].user
         if user.is_anonymous:
             return False
+        if hasattr(recipe, 'user_in_shopping_cart'):
+            return recipe.user_in_shopping_cart
         return user.shoppingcarts.filter(recipe=recipe).exists()
 
 
@@ -222,16 +346,35 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
-    def create_amount_for_ingredients(self, recipe, ingredients):
+    def validate_ingredients(self, ingredients):
+        ids = [ingredient['id'] for ingredient in ingredients]
+        duplicates = sorted(
+            ingredient_id
+            for ingredient_id, count in Counter(ids).items() if count > 1
+        )
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Ингредиенты указаны несколько раз: {duplicates}.'
+            )
+        missing = sorted(set(ids) - Ingredient.objects.in_bulk(ids).keys())
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {missing}.'
+            )
+        return ingredients
 
+    def create_amount_for_ingredients(self, recipe, ingredients):
+        if not ingredients:
+            return
         RecipeIngredient.objects.bulk_create(
             [RecipeIngredient(
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
                 recipe=recipe
             ) for ingredient in ingredients]
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -244,19 +387,69 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         return recipe
 
-    def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredients.clear()
-        instance.tags.set(validated_data.pop('tags'))
-        ingredients = validated_data.pop('ingredients')
-
+    def update_tags(self, recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+
+    def update_ingredients(self, recipe, ingredients):
+        submitted = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = {}
+        to_update, to_delete = [], []
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).order_by('id'):
+            ingredient_id = recipe_ingredient.ingredient_id
+            old_amounts[ingredient_id] = (
+                old_amounts.get(ingredient_id, 0) + recipe_ingredient.amount
+            )
+            amount = submitted.pop(ingredient_id, None)
+            if amount is None:
+                to_delete.append(recipe_ingredient.pk)
+            elif amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+
+        if to_delete:
+            with manual_totals():
+                RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ('amount',))
         self.create_amount_for_ingredients(
-            recipe=instance,
-            ingredients=ingredients
+            recipe=recipe,
+            ingredients=[
+                {'id': ingredient_id, 'amount': amount}
+                for ingredient_id, amount in submitted.items()
+            ]
         )
+        ShoppingListItem.objects.change_recipe(
+            recipe,
+            old_amounts,
+            {
+                ingredient['id']: ingredient['amount']
+                for ingredient in ingredients
+            }
+        )
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        instance = Recipe.objects.select_related('author').with_user_state(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         serializer = RecipeReadSerializer(instance, context=self.context)
         return serializer.data
 
@@ -265,6 +458,7 @@ class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для короткого описания рецепта."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -272,5 +466,6 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time',
         )
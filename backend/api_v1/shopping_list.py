@@ -0,0 +1,109 @@
+import csv
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F
+
+from recipes.models import ShoppingListItem
+
+SHOPPING_LIST_CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+_sync = threading.local()
+
+
+@contextmanager
+def manual_totals():
+    """
+    Отключает обновление итогов списка покупок сигналами моделей:
+    код внутри блока сам пересчитывает итоги одним запросом.
+    """
+    depth = getattr(_sync, 'manual', 0)
+    _sync.manual = depth + 1
+    try:
+        yield
+    finally:
+        _sync.manual = depth
+
+
+def totals_are_manual():
+    return getattr(_sync, 'manual', 0) > 0
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list_etag(user, file_format):
+    """Считает ETag по сохраненным итогам корзины без агрегации."""
+    digest = hashlib.md5(file_format.encode())
+    rows = ShoppingListItem.objects.filter(user=user).order_by(
+        'ingredient_id'
+    ).values_list('ingredient_id', 'total_amount')
+    for row in rows.iterator():
+        digest.update(('%d:%d;' % row).encode())
+    return digest.hexdigest()
+
+
+def get_shopping_list(user):
+    """Возвращает сохраненные итоги корзины пользователя."""
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        total=F('total_amount'),
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def stream_txt(ingredients):
+    for ingredient in ingredients:
+        yield (
+            f"{ingredient['ingredient__name']}  - "
+            f"{ingredient['total']}"
+            f"({ingredient['ingredient__measurement_unit']})\n"
+        )
+
+
+def stream_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['total'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def stream_json(ingredients):
+    yield '['
+    separator = ''
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['total'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+SHOPPING_LIST_STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
+
+
+def stream_shopping_list(user, file_format):
+    """Генерирует список покупок в выбранном формате по частям."""
+    ingredients = get_shopping_list(user).iterator()
+    return SHOPPING_LIST_STREAMS[file_format](ingredients)
@@ -0,0 +1,250 @@
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from backend.counters import change_counter
+from recipes.models import (Favourite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscription
+
+from . import cache
+from .authentication import AUTH_VERSION_KEY
+from .cookable_index import record_change
+from .counters import get_counters
+from .images import IMAGE_SPECS, needs_variants, schedule_variants
+from .ingredient_index import ingredient_index
+from .middleware import install_query_recorder
+from .recipe_cache import AUTHOR_VERSION_KEY, RECIPE_VERSION_KEY
+from .recipe_search import recipe_search_index, update_search_vectors
+from .shopping_list import totals_are_manual
+
+User = get_user_model()
+
+# Поля пользователя, которые не входят в представление автора рецепта.
+UNRENDERED_USER_FIELDS = frozenset(('last_login', 'password'))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сбрасывает индекс поиска и кэш ответов при изменении ингредиентов."""
+    ingredient_index.invalidate()
+    cache.invalidate('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сбрасывает кэш ответов при изменении тегов."""
+    cache.invalidate('tags')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def bump_recipe_version(sender, instance, **kwargs):
+    """Меняет версию закэшированного представления рецепта."""
+    cache.bump_version(RECIPE_VERSION_KEY.format(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def bump_recipe_version_on_ingredients(sender, instance, **kwargs):
+    """Меняет версию рецепта при изменении его ингредиентов."""
+    cache.bump_version(RECIPE_VERSION_KEY.format(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version_on_tags(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Меняет версию рецептов при изменении их тегов."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        cache.bump_version(RECIPE_VERSION_KEY.format(instance.pk))
+    elif pk_set is None:
+        cache.invalidate('tags')
+    else:
+        for recipe_id in pk_set:
+            cache.bump_version(RECIPE_VERSION_KEY.format(recipe_id))
+
+
+@receiver(post_save, sender=User)
+def bump_author_version(sender, instance, update_fields=None, **kwargs):
+    """
+    Меняет версию автора, данные которого входят в рецепты.
+    Сохранение только полей, которых нет в представлении автора,
+    например last_login при входе, рецепты не сбрасывает.
+    """
+    if update_fields and set(update_fields) <= UNRENDERED_USER_FIELDS:
+        return
+    cache.bump_version(AUTHOR_VERSION_KEY.format(instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """
+    Пересчитывает поисковый вектор рецепта после фиксации транзакции,
+    когда ингредиенты рецепта уже сохранены.
+    """
+    transaction.on_commit(lambda: update_search_vectors([instance.pk]))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_on_ingredient(sender, instance, created,
+                                        **kwargs):
+    """Пересчитывает векторы рецептов с переименованным ингредиентом."""
+    if created:
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        transaction.on_commit(lambda: update_search_vectors(recipe_ids))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_search(sender, instance, **kwargs):
+    """Сбрасывает индекс поиска в памяти после удаления рецепта."""
+    recipe_search_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def record_cookable_change(sender, instance, **kwargs):
+    """Отмечает рецепт для обновления индекса подбора по продуктам."""
+    transaction.on_commit(lambda: record_change(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def record_cookable_change_on_ingredients(sender, instance, **kwargs):
+    """Отмечает рецепт, ингредиенты которого изменены по отдельности."""
+    transaction.on_commit(lambda: record_change(instance.recipe_id))
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счетчики избранного, корзин, подписчиков и рецептов."""
+    if not created or raw:
+        return
+    for model, field, foreign_key in get_counters(sender):
+        change_counter(
+            model, [getattr(instance, f'{foreign_key}_id')], field, 1
+        )
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    """Уменьшает счетчики при удалении связи, в том числе каскадном."""
+    for model, field, foreign_key in get_counters(sender):
+        change_counter(
+            model, [getattr(instance, f'{foreign_key}_id')], field, -1
+        )
+
+
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_shopping_list_source(sender, instance, raw=False, **kwargs):
+    """Запоминает прежнее состояние записи, влияющей на список покупок."""
+    instance.previous_state = None
+    if raw or instance._state.adding or totals_are_manual():
+        return
+    instance.previous_state = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def update_shopping_list_on_cart(sender, instance, raw=False, **kwargs):
+    """Переносит в список покупок рецепт, добавленный в корзину."""
+    if raw or totals_are_manual():
+        return
+    previous = getattr(instance, 'previous_state', None)
+    if previous is not None:
+        if (previous.user_id, previous.recipe_id) == (
+            instance.user_id, instance.recipe_id
+        ):
+            return
+        ShoppingListItem.objects.change_cart(
+            previous.user_id, previous.recipe_id, -1
+        )
+    ShoppingListItem.objects.change_cart(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def update_shopping_list_on_ingredient(sender, instance, raw=False,
+                                       **kwargs):
+    """Переносит в списки покупок изменение ингредиента рецепта."""
+    if raw or totals_are_manual():
+        return
+    previous = getattr(instance, 'previous_state', None)
+    if previous is not None:
+        if (
+            previous.recipe_id, previous.ingredient_id, previous.amount
+        ) == (instance.recipe_id, instance.ingredient_id, instance.amount):
+            return
+        ShoppingListItem.objects.change_recipe_ingredient(
+            previous.recipe_id, previous.ingredient_id, -previous.amount
+        )
+    ShoppingListItem.objects.change_recipe_ingredient(
+        instance.recipe_id, instance.ingredient_id, instance.amount
+    )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def update_shopping_list_on_cart_delete(sender, instance, **kwargs):
+    """
+    Вычитает из списка покупок рецепт, удаленный из корзины, по его
+    текущим ингредиентам. При каскадном удалении рецепта его корзины
+    и ингредиенты удаляются в любом порядке: что вычтено по корзинам,
+    уже не найдется по ингредиентам, и наоборот.
+    """
+    if totals_are_manual():
+        return
+    ShoppingListItem.objects.change_cart(
+        instance.user_id, instance.recipe_id, -1
+    )
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def update_shopping_list_on_ingredient_delete(sender, instance, **kwargs):
+    """Вычитает удаленный ингредиент из корзин, где рецепт еще есть."""
+    if totals_are_manual():
+        return
+    ShoppingListItem.objects.change_recipe_ingredient(
+        instance.recipe_id, instance.ingredient_id, -instance.amount
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_auth_version(sender, instance, **kwargs):
+    """Сбрасывает кэш токенов пользователя при его изменении."""
+    cache.bump_version(AUTH_VERSION_KEY.format(instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def bump_auth_version_on_token_delete(sender, instance, **kwargs):
+    """Сбрасывает кэш токенов при удалении токена."""
+    cache.bump_version(AUTH_VERSION_KEY.format(instance.user_id))
+
+
+@receiver(user_logged_out)
+def bump_auth_version_on_logout(sender, user, **kwargs):
+    """Сбрасывает кэш токенов при выходе пользователя."""
+    if user is not None and user.pk is not None:
+        cache.bump_version(AUTH_VERSION_KEY.format(user.pk))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def build_image_variants(sender, instance, **kwargs):
+    """Ставит в очередь уменьшенные копии нового изображения."""
+    spec_name = 'recipe' if sender is Recipe else 'avatar'
+    if needs_variants(instance, IMAGE_SPECS[spec_name]):
+        schedule_variants(spec_name, instance.pk)
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    """Подключает подсчет SQL-запросов к новому соединению с БД."""
+    install_query_recorder(connection)
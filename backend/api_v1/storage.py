@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, которое называет файлы по SHA-256 содержимого.
+    Одинаковые загрузки получают одно имя и записываются один раз,
+    а файл под именем никогда не меняется, поэтому его можно
+    кэшировать навсегда. Файлы не удаляются при смене изображения,
+    их могут использовать другие объекты: неиспользуемые файлы
+    удаляет команда collect_media_garbage.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Обновляем время изменения, чтобы сборщик мусора
+            # не удалил файл до фиксации ссылающейся на него транзакции.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, hexdigest[:2], hexdigest[2:] + extension
+        )
@@ -0,0 +1,296 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (Favourite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscription
+
+from .shopping_list import manual_totals
+
+User = get_user_model()
+
+SYNTHETIC_PREFIX = 'synthetic'
+SYLLABLES = (
+    'ба', 'ва', 'го', 'да', 'же', 'за', 'ки', 'ла', 'ма', 'но',
+    'па', 'ро', 'се', 'ту', 'фа', 'хе', 'це', 'чи', 'ша', 'ёж',
+)
+DISHES = (
+    'суп', 'борщ', 'салат', 'пирог', 'блины', 'каша', 'рагу', 'плов',
+    'котлеты', 'запеканка', 'омлет', 'паста', 'пицца', 'кекс', 'соус',
+)
+DISH_STYLES = (
+    'по-домашнему', 'по-деревенски', 'с грибами', 'с курицей', 'с сыром',
+    'с овощами', 'с яблоками', 'с зеленью', 'на скорую руку', 'без мяса',
+)
+STEPS = (
+    'Нарежьте овощи кубиками.', 'Обжарьте лук до золотистого цвета.',
+    'Добавьте специи и перемешайте.', 'Варите на медленном огне.',
+    'Запекайте в духовке двадцать минут.', 'Подавайте горячим со сметаной.',
+    'Взбейте яйца с молоком.', 'Посолите и поперчите по вкусу.',
+    'Остудите перед подачей.', 'Украсьте свежей зеленью.',
+)
+
+
+def recipe_name(rng, number):
+    """Название рецепта из словаря блюд и способов приготовления."""
+    return (
+        f'{rng.choice(DISHES).capitalize()} '
+        f'{rng.choice(DISH_STYLES)} {number}'
+    )
+
+
+def recipe_text(rng):
+    return ' '.join(rng.sample(STEPS, rng.randint(2, 5)))
+
+
+def ingredient_name(rng, number):
+    """
+    Собирает правдоподобное кириллическое название ингредиента.
+    Метка в конце названия позволяет найти синтетические записи.
+    """
+    word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f'{word} {SYNTHETIC_PREFIX}-{number}'
+
+
+def zipf_cum_weights(size, exponent=1.0):
+    """
+    Накопленные веса распределения Ципфа: первые элементы популярнее,
+    как популярные ингредиенты, теги и активные авторы в жизни.
+    """
+    total, weights = 0.0, []
+    for rank in range(1, size + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+def weighted_sample(rng, population, cum_weights, size):
+    """
+    Выбирает size разных элементов с учетом весов.
+    Если редкие элементы долго не выпадают, добирает их равномерно.
+    """
+    size = min(size, len(population))
+    chosen = {}
+    for _ in range(3):
+        for item in rng.choices(
+            population, cum_weights=cum_weights, k=size * 2
+        ):
+            chosen.setdefault(item, None)
+        if len(chosen) >= size:
+            return list(chosen)[:size]
+    rest = [item for item in population if item not in chosen]
+    return list(chosen) + rng.sample(rest, size - len(chosen))
+
+
+def activity(rng, mean, limit):
+    """Количество действий пользователя: большинство делает мало."""
+    if mean <= 0:
+        return 0
+    return min(int(rng.expovariate(1 / mean)), limit)
+
+
+def clear_dataset():
+    """Удаляет ранее созданные синтетические данные."""
+    with transaction.atomic(), manual_totals():
+        users = User.objects.filter(
+            username__startswith=f'{SYNTHETIC_PREFIX}_'
+        )
+        ShoppingListItem.objects.filter(user__in=users).delete()
+        deleted, _ = users.delete()
+        deleted += Ingredient.objects.filter(
+            name__contains=f' {SYNTHETIC_PREFIX}-'
+        ).delete()[0]
+        deleted += Tag.objects.filter(
+            slug__startswith=f'{SYNTHETIC_PREFIX}-'
+        ).delete()[0]
+    return deleted
+
+
+def seed_dataset(
+    users=1000,
+    recipes=20000,
+    ingredients=2000,
+    tags=10,
+    ingredients_per_recipe=(3, 12),
+    tags_per_recipe=(1, 3),
+    favorites_per_user=20,
+    carts_per_user=3,
+    subscriptions_per_user=10,
+    seed=0,
+    batch_size=5000,
+):
+    """
+    Заполняет базу синтетическими данными пакетными INSERT.
+    Популярность тегов, ингредиентов, авторов и рецептов распределена
+    по Ципфу, активность пользователей - экспоненциально со средними
+    favorites_per_user, carts_per_user и subscriptions_per_user.
+    При ingredients=0 или tags=0 используются уже загруженные записи.
+    Возвращает словарь с количеством созданных строк по таблицам.
+    """
+    rng = random.Random(seed)
+    created = {}
+    now = timezone.now()
+    with transaction.atomic():
+        created['tags'] = len(Tag.objects.bulk_create(
+            (
+                Tag(
+                    name=f'{SYNTHETIC_PREFIX} {number}',
+                    slug=f'{SYNTHETIC_PREFIX}-{number}',
+                )
+                for number in range(tags)
+            ),
+            batch_size=batch_size,
+        ))
+        created['ingredients'] = len(Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=ingredient_name(rng, number),
+                    measurement_unit=rng.choice(('г', 'мл', 'шт')),
+                )
+                for number in range(ingredients)
+            ),
+            batch_size=batch_size,
+        ))
+        created['users'] = len(User.objects.bulk_create(
+            (
+                User(
+                    username=f'{SYNTHETIC_PREFIX}_{number}',
+                    email=f'{SYNTHETIC_PREFIX}_{number}@example.com',
+                    first_name='Имя',
+                    last_name='Фамилия',
+                    password='!',
+                )
+                for number in range(users)
+            ),
+            batch_size=batch_size,
+        ))
+
+        tag_ids = Tag.objects.order_by('id')
+        if tags:
+            tag_ids = tag_ids.filter(slug__startswith=f'{SYNTHETIC_PREFIX}-')
+        ingredient_ids = Ingredient.objects.order_by('id')
+        if ingredients:
+            ingredient_ids = ingredient_ids.filter(
+                name__contains=f' {SYNTHETIC_PREFIX}-'
+            )
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{SYNTHETIC_PREFIX}_'
+        ).order_by('id').values_list('id', flat=True))
+        tag_ids = list(tag_ids.values_list('id', flat=True))
+        ingredient_ids = list(ingredient_ids.values_list('id', flat=True))
+        if not (tag_ids and ingredient_ids and user_ids):
+            raise ValueError(
+                'Нужны хотя бы один пользователь, тег и ингредиент.'
+            )
+        for population in (tag_ids, ingredient_ids, user_ids):
+            rng.shuffle(population)
+        tag_weights = zipf_cum_weights(len(tag_ids))
+        ingredient_weights = zipf_cum_weights(len(ingredient_ids))
+        author_weights = zipf_cum_weights(len(user_ids))
+
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=recipe_name(rng, number),
+                    image='recipe_images/synthetic.png',
+                    text=recipe_text(rng),
+                    cooking_time=rng.randint(1, 180),
+                    author_id=author_id,
+                )
+                for number, author_id in enumerate(rng.choices(
+                    user_ids, cum_weights=author_weights, k=recipes
+                ))
+            ),
+            batch_size=batch_size,
+        )
+        recipe_objects = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).only('id').order_by('id'))
+        for recipe in recipe_objects:
+            recipe.pub_date = now - timedelta(
+                seconds=rng.randint(0, 365 * 24 * 3600)
+            )
+        Recipe.objects.bulk_update(
+            recipe_objects, ('pub_date',), batch_size=batch_size
+        )
+        recipe_ids = [recipe.id for recipe in recipe_objects]
+        created['recipes'] = len(recipe_ids)
+
+        created['recipe_tags'] = len(Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in weighted_sample(
+                    rng, tag_ids, tag_weights,
+                    rng.randint(*tags_per_recipe),
+                )
+            ),
+            batch_size=batch_size,
+        ))
+        created['recipe_ingredients'] = len(
+            RecipeIngredient.objects.bulk_create(
+                (
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=rng.randint(1, 500),
+                    )
+                    for recipe_id in recipe_ids
+                    for ingredient_id in weighted_sample(
+                        rng, ingredient_ids, ingredient_weights,
+                        rng.randint(*ingredients_per_recipe),
+                    )
+                ),
+                batch_size=batch_size,
+            )
+        )
+
+        popular_recipes = recipe_ids[:]
+        rng.shuffle(popular_recipes)
+        recipe_weights = zipf_cum_weights(len(popular_recipes))
+
+        def pairs(mean, population, weights):
+            for user_id in user_ids:
+                size = activity(rng, mean, len(population))
+                if size:
+                    for target_id in weighted_sample(
+                        rng, population, weights, size
+                    ):
+                        yield user_id, target_id
+
+        created['favorites'] = len(Favourite.objects.bulk_create(
+            (
+                Favourite(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in pairs(
+                    favorites_per_user, popular_recipes, recipe_weights
+                )
+            ),
+            batch_size=batch_size,
+        ))
+        created['shopping_carts'] = len(ShoppingCart.objects.bulk_create(
+            (
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in pairs(
+                    carts_per_user, popular_recipes, recipe_weights
+                )
+            ),
+            batch_size=batch_size,
+        ))
+        created['subscriptions'] = len(Subscription.objects.bulk_create(
+            (
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id, author_id in pairs(
+                    subscriptions_per_user, user_ids, author_weights
+                )
+                if user_id != author_id
+            ),
+            batch_size=batch_size,
+        ))
+        created['shopping_list_items'] = ShoppingListItem.objects.rebuild(
+            batch_size=batch_size
+        )
+    return created
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from . import async_views
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsView,
+                    RecipeViewSet, TagViewSet)
 
 router = SimpleRouter()
 router.register('recipes', RecipeViewSet, basename='recipe')
@@ -11,8 +13,29 @@ router.register('ingredients', IngredientViewSet, basename='ingredient')
 router.register('users', CustomUserViewSet, basename='user')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
 
     path('', include('djoser.urls.jwt')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_VIEWS_ENABLED:
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list, name='recipe-list'),
+        path(
+            'recipes/<int:pk>/',
+            async_views.recipe_detail,
+            name='recipe-detail',
+        ),
+        path('tags/', async_views.tag_list, name='tag-list'),
+        path('tags/<int:pk>/', async_views.tag_detail, name='tag-detail'),
+        path(
+            'ingredients/', async_views.ingredient_list, name='ingredient-list'
+        ),
+        path(
+            'ingredients/<int:pk>/',
+            async_views.ingredient_detail,
+            name='ingredient-detail',
+        ),
+    ] + urlpatterns
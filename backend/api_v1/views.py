@@ -1,25 +1,41 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from recipes.models import (Favourite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscription
-from .filters import FilterForFavouritesAndShopingCard, FilterForIngredients
-from .pagination import CustomPagination
-from .permissions import IsAdminAuthorOrReadOnly
-from .serializers import (CustomUserSerializer, IngredientSerializer,
-                          RecipeReadSerializer, RecipeShortSerializer,
-                          RecipeWriteSerializer, SubscriptionSerializer,
+from .cache import CachedResponseMixin
+from .cookable_index import cookable_index
+from .filters import FilterForFavouritesAndShopingCard
+from .ingredient_index import ingredient_index
+from .metrics import request_metrics
+from .pagination import CustomPagination, RecipePagination
+from .permissions import IsAdmin, IsAdminAuthorOrReadOnly
+from .recipe_cache import get_recipe_cache_stats
+from .recipe_lists import (EXISTS, add_recipes, clear_shopping_cart,
+                           remove_recipes)
+from .renderers import (CSVRenderer, FastJSONRenderer, PlainTextRenderer,
+                        PrometheusRenderer)
+from .serializers import (CookableParamsSerializer, CustomUserSerializer,
+                          IngredientSearchSerializer, IngredientSerializer,
+                          RecipeIdsSerializer, RecipeReadSerializer,
+                          RecipeShortSerializer, RecipeWriteSerializer,
+                          SubscriptionParamsSerializer, SubscriptionSerializer,
                           TagSerializer)
+from .shopping_list import (SHOPPING_LIST_CONTENT_TYPES,
+                            get_shopping_list_etag, stream_shopping_list)
 
 User = get_user_model()
 
@@ -29,11 +45,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     queryset = Recipe.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
-    pagination_class = PageNumberPagination
+    pagination_class = RecipePagination
     permission_classes = (IsAdminAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FilterForFavouritesAndShopingCard
 
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').defer(
+            'search_vector'
+        ).with_user_state(self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(author_id=self.request.user.id)
 
@@ -53,13 +74,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = get_object_or_404(Recipe, pk=pk)
 
         if request.method == 'POST':
-            Favourite.objects.create(user=request.user, recipe=recipe)
+            result = add_recipes(Favourite, request.user, [recipe.pk])
+            if result[recipe.pk] == EXISTS:
+                raise ValidationError('Рецепт уже в избранном.')
             return Response(
                 RecipeShortSerializer(recipe).data,
                 status=status.HTTP_201_CREATED
             )
 
-        recipe.is_favorited.filter(user=request.user).delete()
+        remove_recipes(Favourite, request.user, [recipe.pk])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -72,43 +95,129 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = get_object_or_404(Recipe, pk=pk)
 
         if request.method == 'POST':
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
+            result = add_recipes(ShoppingCart, request.user, [recipe.pk])
+            if result[recipe.pk] == EXISTS:
+                raise ValidationError('Рецепт уже в корзине.')
             return Response(
                 RecipeShortSerializer(recipe).data,
                 status=status.HTTP_201_CREATED
             )
 
-        recipe.is_in_shopping_cart.filter(user=request.user).delete()
+        remove_recipes(ShoppingCart, request.user, [recipe.pk])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite',
+    )
+    def favourites_bulk(self, request):
+        return self.change_recipe_list(request, Favourite)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.change_recipe_list(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=('delete',),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart/clear',
+    )
+    def shopping_cart_clear(self, request):
+        clear_shopping_cart(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def change_recipe_list(self, request, model):
+        """
+        Добавляет или удаляет рецепты из списка ids в теле запроса
+        или в параметрах ?recipes= и возвращает статус каждого id.
+        """
+        params = RecipeIdsSerializer(
+            data=request.data or request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        change = add_recipes if request.method == 'POST' else remove_recipes
+        results = change(
+            model, request.user, params.validated_data['recipes']
+        )
+        return Response({'results': [
+            {'id': recipe_id, 'status': result}
+            for recipe_id, result in results.items()
+        ]})
+
     @action(
         detail=False,
         methods=('get',),
         permission_classes=(IsAuthenticated,),
         url_path='download_shopping_cart',
+        renderer_classes=(PlainTextRenderer, CSVRenderer, FastJSONRenderer),
     )
     def download_shopping_cart(self, request):
+        file_format = request.accepted_renderer.format
+        etag = quote_etag(get_shopping_list_etag(request.user, file_format))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = StreamingHttpResponse(
+            stream_shopping_list(request.user, file_format),
+            content_type=SHOPPING_LIST_CONTENT_TYPES[file_format],
+        )
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept',))
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_format}"'
+        )
+        return response
 
-        ingredients = RecipeIngredient.objects.filter(
-            recipes__is_in_shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(sum=Sum('amount'))
-
-        shopping_list = ''
-        for ingredient in ingredients:
-            shopping_list += (
-                f"{ingredient['ingredient__name']}  - "
-                f"{ingredient['sum']}"
-                f"({ingredient['ingredient__measurement_unit']})\n"
-            )
-        return HttpResponse(shopping_list, content_type='text/plain')
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='cookable',
+        pagination_class=CustomPagination,
+    )
+    def cookable(self, request):
+        params = CookableParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ingredient_ids = params.validated_data['ingredients']
+        ranked = cookable_index.match(
+            ingredient_ids, params.validated_data.get('max_missing')
+        )
+        page = self.paginate_queryset(ranked)
+        recipe_ids = [recipe_id for recipe_id, _ in page]
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        missing = cookable_index.missing(recipe_ids, ingredient_ids)
+        data = RecipeReadSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        for recipe in data:
+            recipe['missing_ingredients'] = missing[recipe['id']]
+        return self.get_paginated_response(data)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAdmin,),
+        url_path='cache_stats',
+    )
+    def cache_stats(self, request):
+        return Response(get_recipe_cache_stats())
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Вьюсет для тегов."""
 
+    cache_namespace = 'tags'
+
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ['get']
@@ -116,16 +225,24 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Вьюсет для ингридиентов."""
 
+    cache_namespace = 'ingredients'
+
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     http_method_names = ['get']
     permission_classes = (AllowAny,)
     pagination_class = None
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = FilterForIngredients
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.search)
+
+    def search(self, request):
+        params = IngredientSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(ingredient_index.search(**params.validated_data))
 
 
 class CustomUserViewSet(UserViewSet):
@@ -148,7 +265,8 @@ class CustomUserViewSet(UserViewSet):
 
         if request.method == 'DELETE':
             if user.avatar:
-                user.avatar.delete(save=True)
+                user.avatar = ''
+                user.save(update_fields=('avatar',))
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response('Аватар не найден',
                             status=status.HTTP_404_NOT_FOUND)
@@ -168,17 +286,19 @@ class CustomUserViewSet(UserViewSet):
         author = get_object_or_404(User, id=id)
 
         if request.method == 'POST':
-            created = Subscription.objects.get_or_create(
+            params = SubscriptionParamsSerializer(data=request.query_params)
+            params.is_valid(raise_exception=True)
+            Subscription.objects.get_or_create(
                 user=user,
                 author=author
             )
-            if created:
-                recipes_limit = request.query_params.get('recipes_limit')
-                serializer = SubscriptionSerializer(
-                    author,
-                    context={'request': request,
-                             'recipes_limit': recipes_limit}
-                )
+            self.attach_latest_recipes(
+                [author], params.validated_data.get('recipes_limit')
+            )
+            serializer = SubscriptionSerializer(
+                author,
+                context={'request': request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -196,23 +316,42 @@ class CustomUserViewSet(UserViewSet):
         url_path='subscriptions',
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = User.objects.filter(is_subscribed__user=user)
-        recipes_limit = request.query_params.get('recipes_limit')
+        params = SubscriptionParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = User.objects.filter(is_subscribed__user=request.user)
 
         page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = SubscriptionSerializer(
-                page,
-                many=True,
-                context={'request': request, 'recipes_limit': recipes_limit},
-            )
-            return self.get_paginated_response(serializer.data)
-
+        authors = list(queryset) if page is None else page
+        self.attach_latest_recipes(
+            authors, params.validated_data.get('recipes_limit')
+        )
         serializer = SubscriptionSerializer(
-            queryset,
+            authors,
             many=True,
-            context={'request': request, 'recipes_limit': recipes_limit},
-        ).annotate(recipes_count=Count('author__recipes'))
-        return Response(serializer.data)
+            context={'request': request},
+        )
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def attach_latest_recipes(self, authors, recipes_limit):
+        latest_recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_for_authors(
+            [author.id for author in authors], recipes_limit
+        ):
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.id]
+
+
+class MetricsView(APIView):
+    """Метрики запросов по маршрутам в формате Prometheus."""
+
+    permission_classes = (IsAdmin,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(
+            request_metrics.render(),
+            content_type=PrometheusRenderer.content_type,
+        )
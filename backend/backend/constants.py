@@ -4,3 +4,6 @@ RECIPE_INGREDIENT_COOKING_TIME_MIN = 1
 RECIPE_INGREDIENT_COOKING_TIME_MAX = 32000
 INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH = 100
 INGREDIENT_NAME_MAX_LENGTH = 50
+INGREDIENT_SEARCH_LIMIT_MAX = 1000
+COOKABLE_INGREDIENTS_MAX = 100
+RECIPE_BULK_MAX = 100
@@ -0,0 +1,37 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+class CounterFieldsMixin:
+    """
+    Миксин модели с денормализованными счетчиками.
+    Счетчики меняются только через change_counter, поэтому обычное
+    сохранение существующего объекта их не перезаписывает значениями,
+    прочитанными из БД до параллельного изменения.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(model, pks, field, delta):
+    """
+    Атомарно меняет счетчик объектов в БД одним UPDATE,
+    не опуская его ниже нуля.
+    """
+    if delta and pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
@@ -16,6 +16,7 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'api_v1.storage.ContentHashStorage'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
 
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_v1.middleware.RequestMetricsMiddleware',
+    'api_v1.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -79,7 +82,7 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
@@ -111,17 +114,26 @@ USE_TZ = True
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api_v1.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api_v1.authentication.CachingTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+SIMPLE_JWT = {
+    # Приложение token_blacklist не установлено, без этого
+    # /api/jwt/verify/ обращается к его таблице и падает с 500.
+    'BLACKLIST_AFTER_ROTATION': False,
+}
+
 DJOSER = {
     'SERIALIZERS': {
         'user_create': 'api_v1.serializers.CustomUserCreateSerializer',
@@ -135,5 +147,68 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 24 * 60 * 60))
+
+INGREDIENT_SEARCH_INDEX_TTL = int(
+    os.getenv('INGREDIENT_SEARCH_INDEX_TTL', 300)
+)
+
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', 5 * 1024 * 1024)
+)
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 25_000_000))
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+# Изображение в base64 на треть больше исходного файла.
+DATA_UPLOAD_MAX_MEMORY_SIZE = IMAGE_UPLOAD_MAX_BYTES * 4 // 3 + 1024 * 1024
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+RECIPE_SEARCH_INDEX_TTL = int(os.getenv('RECIPE_SEARCH_INDEX_TTL', 300))
+RECIPE_SEARCH_FALLBACK_LIMIT = int(
+    os.getenv('RECIPE_SEARCH_FALLBACK_LIMIT', 1000)
+)
+COOKABLE_INDEX_MAX_LAG = int(os.getenv('COOKABLE_INDEX_MAX_LAG', 1000))
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+ASYNC_VIEWS_ENABLED = SERVER_MODE == 'asgi'
+
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', 20))
+REQUEST_TIME_BUDGET_MS = int(os.getenv('REQUEST_TIME_BUDGET_MS', 500))
+SERVER_TIMING_ENABLED = (
+    os.getenv('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api_v1.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
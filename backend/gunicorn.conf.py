@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+import sys
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+# Кэш в памяти процесса: сброс версий и токенов из одного воркера
+# не виден остальным, поэтому с ним запускается один воркер.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+PROCESS_LOCAL_CACHE = CACHE_BACKEND.endswith('.LocMemCache')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.getenv(
+    'WEB_CONCURRENCY',
+    1 if PROCESS_LOCAL_CACHE else multiprocessing.cpu_count() * 2 + 1,
+))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+
+
+def on_starting(server):
+    """Не запускает несколько воркеров с кэшем в памяти процесса."""
+    if PROCESS_LOCAL_CACHE and server.cfg.workers > 1:
+        server.log.error(
+            'Воркеров: %s, а CACHE_BACKEND=%s хранит кэш в памяти каждого '
+            'процесса, и сброс кэша дойдет только до одного из них. '
+            'Укажите общий кэш (django_redis.cache.RedisCache) '
+            'или WEB_CONCURRENCY=1.',
+            server.cfg.workers, CACHE_BACKEND,
+        )
+        sys.exit(1)
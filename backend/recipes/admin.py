@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from recipes.models import (Favourite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 
 
 class RecipeAdmin(admin.ModelAdmin):
@@ -11,12 +11,27 @@ class RecipeAdmin(admin.ModelAdmin):
         'image',
         'text',
         'cooking_time',
+        'favorites_count',
+        'carts_count',
     )
 
 
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """Итоги списка покупок только для просмотра: их ведут сигналы."""
+
+    list_display = ('user', 'ingredient', 'total_amount')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag)
 admin.site.register(Ingredient)
 admin.site.register(Favourite)
 admin.site.register(ShoppingCart)
 admin.site.register(RecipeIngredient)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+def merge_duplicate_recipe_ingredients(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = RecipeIngredient.objects.values(
+        'recipe_id', 'ingredient_id'
+    ).annotate(
+        count=models.Count('id'),
+        keep_id=models.Min('id'),
+        total=models.Sum('amount'),
+    ).filter(count__gt=1).order_by()
+    for row in duplicates.iterator():
+        RecipeIngredient.objects.filter(
+            recipe_id=row['recipe_id'],
+            ingredient_id=row['ingredient_id'],
+        ).exclude(id=row['keep_id']).delete()
+        RecipeIngredient.objects.filter(id=row['keep_id']).update(
+            amount=row['total']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_recipe_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_pattern_idx', opclasses=('varchar_pattern_ops',)),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
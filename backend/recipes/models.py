@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import models, transaction
+from django.db.models import (Case, Exists, F, OuterRef, Prefetch, Sum,
+                              UniqueConstraint, Value, When, Window)
+from django.db.models.functions import Greatest, RowNumber
 
 from backend.constants import (INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
                                INGREDIENT_NAME_MAX_LENGTH,
@@ -9,6 +13,7 @@ from backend.constants import (INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
                                RECIPE_INGREDIENT_AMOUNT_MIN,
                                RECIPE_INGREDIENT_COOKING_TIME_MAX,
                                RECIPE_INGREDIENT_COOKING_TIME_MIN)
+from backend.counters import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -56,14 +61,111 @@ class Ingredient(models.Model):
         verbose_name_plural = 'Ингредиенты'
         default_related_name = 'ingredients'
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=('name',), name='ingredient_name_idx'),
+            models.Index(
+                fields=('name',),
+                name='ingredient_name_pattern_idx',
+                opclasses=('varchar_pattern_ops',),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+def get_recipe_prefetches():
+    """Возвращает связи, нужные для выдачи рецепта: теги и ингредиенты."""
+    return (
+        'tags',
+        Prefetch(
+            'recipeingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient'
+            ).order_by('ingredient__name'),
+        ),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset рецептов с подготовкой данных для выдачи в API."""
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты рецептов."""
+        return self.select_related('author').prefetch_related(
+            *get_recipe_prefetches()
+        )
+
+    def with_user_state(self, user):
+        """
+        Добавляет флаги избранного и корзины для пользователя
+        подзапросами EXISTS.
+        """
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                user_favorited=Value(False, models.BooleanField()),
+                user_in_shopping_cart=Value(False, models.BooleanField()),
+            )
+        return self.annotate(
+            user_favorited=Exists(
+                Favourite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            user_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def latest_for_authors(self, author_ids, limit=None):
+        """
+        Возвращает последние рецепты каждого автора одним запросом.
+        Номер рецепта внутри автора считается оконной функцией ROW_NUMBER.
+        """
+        author_ids = list(author_ids)
+        if not author_ids:
+            return self.none()
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        ).order_by().values(
+            'id', 'name', 'image', 'image_variants', 'cooking_time',
+            'author_id', 'row_number',
+        )
+        sql, params = ranked.query.sql_with_params()
+        where = ''
+        if limit is not None:
+            where = 'WHERE ranked.row_number <= %s'
+            params = (*params, limit)
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked {where} '
+            'ORDER BY ranked.author_id, ranked.row_number',
+            params,
+        )
+
+    def popular(self):
+        """Сортирует рецепты по числу добавлений в избранное."""
+        return self.order_by('-favorites_count', '-pub_date', '-id')
+
+    def favorited_by(self, user):
+        """Оставляет рецепты из избранного пользователя."""
+        return self.filter(Exists(
+            Favourite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ))
+
+    def in_shopping_cart_of(self, user):
+        """Оставляет рецепты из корзины пользователя."""
+        return self.filter(Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ))
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель рецепта."""
 
+    counter_fields = ('favorites_count', 'carts_count')
+
     name = models.CharField(
         verbose_name='Название рецепта',
         help_text='Укажите название рецепта.',
@@ -74,6 +176,12 @@ class Recipe(models.Model):
         help_text='Добавте фото вашего рецепта.',
         upload_to='recipe_images'
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
         help_text='Напишите описание рецепта.',
@@ -116,11 +224,46 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=('pub_date', 'id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date', 'id'),
+                name='recipe_author_pub_date_idx',
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx',
+            ),
+            models.Index(
+                fields=('favorites_count', 'pub_date', 'id'),
+                name='recipe_popular_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -158,6 +301,12 @@ class RecipeIngredient(models.Model):
         verbose_name = 'Количество ингредиента в рецепте'
         verbose_name_plural = 'Количество ингредиента в рецептах'
         ordering = ('ingredient',)
+        constraints = [
+            UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_recipe_ingredient',
+            )
+        ]
 
     def __str__(self):
         return f'Количество {self.ingredient} -  {self.amount}'
@@ -223,3 +372,207 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe} в корзтну.'
+
+
+class ShoppingListItemManager(models.Manager):
+    """Менеджер для поддержки сводного списка покупок."""
+
+    def apply_delta(self, user_ids, deltas):
+        """Прибавляет к итогам пользователей изменения по ингредиентам."""
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        user_ids = list(user_ids)
+        if not deltas or not user_ids:
+            return
+        # Недостающие строки создаются с нулем и пропускаются при
+        # конфликте, а итоги меняет один UPDATE. Поэтому параллельные
+        # первые добавления одного ингредиента не падают на уникальности.
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=0,
+                    )
+                    for user_id in user_ids
+                    for ingredient_id, delta in deltas.items() if delta > 0
+                ],
+                ignore_conflicts=True,
+            )
+            items = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+            items.update(total_amount=Greatest(
+                F('total_amount') + Case(
+                    *(
+                        When(ingredient_id=ingredient_id, then=Value(delta))
+                        for ingredient_id, delta in deltas.items()
+                    ),
+                    default=Value(0),
+                    output_field=models.IntegerField(),
+                ),
+                0,
+            ))
+            if any(delta < 0 for delta in deltas.values()):
+                items.filter(total_amount=0).delete()
+
+    def add_recipes(self, user, recipe_ids):
+        """Учитывает несколько рецептов, добавленных в корзину."""
+        self.apply_delta((user.id,), get_recipes_amounts(recipe_ids))
+
+    def remove_recipes(self, user, recipe_ids):
+        """Вычитает несколько рецептов, удаленных из корзины."""
+        self.apply_delta(
+            (user.id,), get_recipes_amounts(recipe_ids, sign=-1)
+        )
+
+    def change_cart(self, user_id, recipe_id, sign=1):
+        """Учитывает рецепт, добавленный в корзину или удаленный из нее."""
+        self.apply_delta((user_id,), get_recipes_amounts([recipe_id], sign))
+
+    def change_recipe_ingredient(self, recipe_id, ingredient_id, delta):
+        """Переносит изменение количества ингредиента рецепта в корзины."""
+        self.apply_delta(
+            get_cart_user_ids(recipe_id), {ingredient_id: delta}
+        )
+
+    def change_recipe(self, recipe, old_amounts, new_amounts=None):
+        """Переносит изменение состава рецепта в корзины пользователей."""
+        if new_amounts is None:
+            new_amounts = get_recipe_amounts(recipe)
+        deltas = {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        self.apply_delta(get_cart_user_ids(recipe.pk), deltas)
+
+    def expected_totals(self, user=None):
+        """Считает итоги по корзинам напрямую из рецептов."""
+        if user is None:
+            ingredients = RecipeIngredient.objects.filter(
+                recipe__is_in_shopping_cart__isnull=False
+            )
+        else:
+            ingredients = RecipeIngredient.objects.filter(
+                recipe__is_in_shopping_cart__user=user
+            )
+        return ingredients.values(
+            'ingredient_id',
+            user_id=F('recipe__is_in_shopping_cart__user'),
+        ).annotate(total=Sum('amount')).order_by()
+
+    def rebuild(self, user=None, batch_size=1000):
+        """Пересобирает сводный список покупок с нуля."""
+        with transaction.atomic():
+            items = self.all()
+            if user is not None:
+                items = items.filter(user=user)
+            items.delete()
+            return len(self.bulk_create(
+                (
+                    self.model(
+                        user_id=row['user_id'],
+                        ingredient_id=row['ingredient_id'],
+                        total_amount=row['total'],
+                    )
+                    for row in self.expected_totals(user).iterator()
+                ),
+                batch_size=batch_size,
+            ))
+
+    def find_inconsistencies(self, user=None):
+        """
+        Сравнивает сохраненные итоги с рассчитанными.
+        Возвращает список кортежей (user_id, ingredient_id, хранится, нужно).
+        """
+        stored = self.all()
+        if user is not None:
+            stored = stored.filter(user=user)
+        actual = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in stored.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            ).iterator()
+        }
+        mismatches = []
+        for row in self.expected_totals(user).iterator():
+            key = (row['user_id'], row['ingredient_id'])
+            total = actual.pop(key, None)
+            if total != row['total']:
+                mismatches.append((*key, total, row['total']))
+        mismatches.extend(
+            (*key, total, None) for key, total in actual.items()
+        )
+        return mismatches
+
+
+def get_cart_user_ids(recipe_id):
+    """Возвращает id пользователей, у которых рецепт в корзине."""
+    return ShoppingCart.objects.filter(recipe_id=recipe_id).order_by(
+    ).values_list('user_id', flat=True)
+
+
+def get_recipe_amounts(recipe, sign=1):
+    """Возвращает количество каждого ингредиента в рецепте."""
+    return {
+        ingredient_id: sign * total
+        for ingredient_id, total in recipe.recipeingredients.values(
+            'ingredient_id'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by().values_list('ingredient_id', 'total')
+    }
+
+
+def get_recipes_amounts(recipe_ids, sign=1):
+    """Возвращает суммарное количество каждого ингредиента в рецептах."""
+    if not recipe_ids:
+        return {}
+    return {
+        ingredient_id: sign * total
+        for ingredient_id, total in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id').annotate(
+            total=Sum('amount')
+        ).order_by().values_list('ingredient_id', 'total')
+    }
+
+
+class ShoppingListItem(models.Model):
+    """Модель итогового количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество ингредиента',
+    )
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Список покупок'
+        ordering = ('user',)
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.total_amount}'
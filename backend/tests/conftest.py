@@ -0,0 +1,101 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from api_v1.authentication import token_cache
+from api_v1.ingredient_index import ingredient_index
+from api_v1.recipe_search import recipe_search_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+IMAGE = 'recipe_images/test.png'
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Каждый тест начинает с пустых кэшей и индексов процесса."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_WORKERS = 0
+    for cache in caches.all():
+        cache.clear()
+    token_cache.clear()
+    ingredient_index.invalidate()
+    recipe_search_index.invalidate()
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='cook',
+        email='cook@example.com',
+        first_name='Иван',
+        last_name='Поваров',
+        password='Kx7-pQ2-vL9-zR4',
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author',
+        email='author@example.com',
+        first_name='Анна',
+        last_name='Авторова',
+        password='Kx7-pQ2-vL9-zR4',
+    )
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=f'Продукт {number}',
+                                  measurement_unit='г')
+        for number in range(10)
+    ]
+
+
+@pytest.fixture
+def make_recipe(author, tags, ingredients):
+    """Создает рецепт автора с тегом и ингредиентами."""
+
+    def make(name='Рецепт', amounts=None, recipe_author=None):
+        recipe = Recipe.objects.create(
+            author=recipe_author or author,
+            name=name,
+            text='Описание',
+            cooking_time=10,
+            image=IMAGE,
+        )
+        recipe.tags.set(tags[:2])
+        if amounts is None:
+            amounts = {ingredient: 100 for ingredient in ingredients[:3]}
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in amounts.items()
+        )
+        return recipe
+
+    return make
@@ -0,0 +1,11 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+def test_jwt_verify(api_client, user):
+    tokens = api_client.post('/api/jwt/create/', {
+        'email': user.email, 'password': 'Kx7-pQ2-vL9-zR4'
+    }).json()
+    response = api_client.post('/api/jwt/verify/', {'token': tokens['access']})
+    assert response.status_code == 200
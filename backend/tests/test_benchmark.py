@@ -0,0 +1,43 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api_v1.benchmark import ApiBenchmark, format_report
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+ITERATIONS = int(os.getenv('BENCHMARK_ITERATIONS', 10))
+REPORT_PATH = os.getenv('BENCHMARK_REPORT')
+
+
+@pytest.fixture
+def load_data():
+    call_command(
+        'generate_load_data',
+        users=int(os.getenv('BENCHMARK_USERS', 50)),
+        recipes=int(os.getenv('BENCHMARK_RECIPES', 500)),
+        ingredients=100,
+        tags=5,
+        stdout=StringIO(),
+    )
+
+
+def test_api_benchmark(load_data, capsys):
+    report = ApiBenchmark().run(iterations=ITERATIONS, warmup=1)
+    with capsys.disabled():
+        print()
+        for line in format_report(report):
+            print(line)
+    if REPORT_PATH:
+        with open(REPORT_PATH, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    failed = {
+        name: result['statuses']
+        for name, result in report['endpoints'].items()
+        if max(result['statuses']) >= 500
+    }
+    assert failed == {}
@@ -0,0 +1,26 @@
+import pytest
+
+from api_v1.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def pantry():
+    for name in ('Сыр', 'Сахар', 'Соль', 'Сок', 'Фасоль'):
+        Ingredient.objects.create(name=name, measurement_unit='г')
+    ingredient_index.invalidate()
+
+
+def names(query):
+    return [item['name'] for item in ingredient_index.search(query)]
+
+
+def test_short_query_skips_fuzzy_matches(pantry):
+    assert names('сок') == ['Сок']
+    assert names('сол') == ['Соль', 'Фасоль']
+
+
+def test_long_query_finds_typos(pantry):
+    assert names('сахор') == ['Сахар']
@@ -0,0 +1,142 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api_v1.cache import get_versions
+from api_v1.recipe_cache import AUTHOR_VERSION_KEY
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = '/api/recipes/'
+
+
+def count_queries(client, limit):
+    """Число SQL-запросов списка рецептов при холодном кэше."""
+    for cache in caches.all():
+        cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(RECIPES_URL, {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+    return len(context)
+
+
+@pytest.fixture
+def feed(make_recipe, user, author):
+    recipes = [make_recipe(name=f'Рецепт {number}') for number in range(6)]
+    user.favorites.create(recipe=recipes[0])
+    user.shoppingcarts.create(recipe=recipes[1])
+    user.subscriber.create(author=author)
+    return recipes
+
+
+@pytest.mark.parametrize('client_name', ('api_client', 'user_client'))
+def test_recipe_list_queries_do_not_grow_with_page_size(
+    request, feed, client_name
+):
+    client = request.getfixturevalue(client_name)
+    assert count_queries(client, 1) == count_queries(client, 6)
+
+
+def test_recipe_list_user_flags(user_client, feed):
+    response = user_client.get(RECIPES_URL, {'limit': 6})
+    flags = {
+        recipe['id']: (recipe['is_favorited'], recipe['is_in_shopping_cart'])
+        for recipe in response.json()['results']
+    }
+    assert flags[feed[0].id] == (True, False)
+    assert flags[feed[1].id] == (False, True)
+    assert flags[feed[2].id] == (False, False)
+    assert all(
+        recipe['author']['is_subscribed']
+        for recipe in response.json()['results']
+    )
+
+
+@pytest.mark.parametrize('params', (
+    {'count': 'some'},
+    {'cursor': 'not-a-cursor'},
+    {'cursor': 'eyJkIjogMX0='},
+))
+def test_recipe_list_rejects_bad_pagination_params(api_client, params):
+    response = api_client.get(RECIPES_URL, params)
+    assert response.status_code == 400
+    assert list(response.json()) == list(params)
+
+
+def test_recipe_list_cursor_pages(api_client, feed):
+    response = api_client.get(RECIPES_URL, {'cursor': '', 'limit': 4})
+    first = response.json()
+    assert len(first['results']) == 4
+    second = api_client.get(first['next']).json()
+    assert second['next'] is None
+    pages = first['results'] + second['results']
+    assert [recipe['id'] for recipe in pages] == [
+        recipe.id for recipe in reversed(feed)
+    ]
+
+
+def test_recipe_list_cursor_keeps_popular_ordering(api_client, feed,
+                                                   django_user_model):
+    for number, recipe in enumerate(feed[:4]):
+        for fan in range(number % 3):
+            fan_user = django_user_model.objects.create_user(
+                username=f'fan{number}{fan}',
+                email=f'fan{number}{fan}@example.com',
+                password='Kx7-pQ2-vL9-zR4',
+            )
+            fan_user.favorites.create(recipe=recipe)
+    expected = [
+        recipe['id'] for recipe in api_client.get(
+            RECIPES_URL, {'ordering': 'popular', 'limit': 6}
+        ).json()['results']
+    ]
+    page = api_client.get(
+        RECIPES_URL, {'ordering': 'popular', 'cursor': '', 'limit': 2}
+    ).json()
+    pages = page['results']
+    while page['next']:
+        page = api_client.get(page['next']).json()
+        pages += page['results']
+    assert [recipe['id'] for recipe in pages] == expected
+    assert expected[:2] == [feed[2].id, feed[1].id]
+
+
+def test_recipe_list_cursor_rejects_search(api_client, feed):
+    response = api_client.get(
+        RECIPES_URL, {'search': 'рецепт', 'cursor': ''}
+    )
+    assert response.status_code == 400
+    assert list(response.json()) == ['cursor']
+
+
+def test_recipe_list_cursor_from_other_ordering(api_client, feed):
+    first = api_client.get(RECIPES_URL, {'cursor': '', 'limit': 2}).json()
+    cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+    assert api_client.get(
+        RECIPES_URL, {'cursor': cursor}
+    ).status_code == 200
+    response = api_client.get(
+        RECIPES_URL, {'ordering': 'popular', 'cursor': cursor}
+    )
+    assert response.status_code == 400
+
+
+def test_login_keeps_author_version(api_client, author,
+                                    django_capture_on_commit_callbacks):
+    key = AUTHOR_VERSION_KEY.format(author.pk)
+    version = get_versions([key])[key]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post('/api/auth/token/login/', {
+            'email': author.email, 'password': 'Kx7-pQ2-vL9-zR4'
+        })
+    assert response.status_code == 200
+    assert get_versions([key])[key] == version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Мария'
+        author.save()
+    assert get_versions([key])[key] != version
@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, ShoppingListItem
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def week_plan(make_recipe):
+    return [make_recipe(name=f'Рецепт {number}').id for number in range(5)]
+
+
+def remove_queries(client, url, recipe_ids):
+    client.post(url, {'recipes': recipe_ids}, format='json')
+    with CaptureQueriesContext(connection) as context:
+        response = client.delete(url, {'recipes': recipe_ids}, format='json')
+    assert response.status_code == 200
+    assert {
+        result['status'] for result in response.json()['results']
+    } == {'removed'}
+    return len(context)
+
+
+@pytest.mark.parametrize(
+    'url', ('/api/recipes/favorite/', '/api/recipes/shopping_cart/')
+)
+def test_bulk_remove_queries_do_not_grow(user_client, week_plan, url):
+    assert remove_queries(user_client, url, week_plan[:1]) == (
+        remove_queries(user_client, url, week_plan)
+    )
+
+
+def test_bulk_remove_updates_counters(user_client, user, week_plan):
+    for url in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/'):
+        user_client.post(url, {'recipes': week_plan}, format='json')
+    user_client.delete(
+        '/api/recipes/favorite/', {'recipes': week_plan[:3]}, format='json'
+    )
+    user_client.delete('/api/recipes/shopping_cart/clear/')
+    counters = dict(Recipe.objects.values_list(
+        'id', 'favorites_count'
+    ))
+    assert [counters[pk] for pk in week_plan] == [0, 0, 0, 1, 1]
+    assert set(Recipe.objects.values_list('carts_count', flat=True)) == {0}
+    assert not ShoppingListItem.objects.filter(user=user).exists()
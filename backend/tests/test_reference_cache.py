@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+@pytest.mark.parametrize('params', ({}, {'name': 'продукт 1'}))
+def test_ingredient_list_is_cached(api_client, ingredients, params):
+    first = api_client.get(INGREDIENTS_URL, params)
+    assert first.status_code == 200
+    assert first['ETag']
+    assert first['Last-Modified']
+    with CaptureQueriesContext(connection) as context:
+        second = api_client.get(INGREDIENTS_URL, params)
+    assert len(context) == 0
+    assert second.content == first.content
+
+    not_modified = api_client.get(
+        INGREDIENTS_URL, params, HTTP_IF_NONE_MATCH=first['ETag']
+    )
+    assert not_modified.status_code == 304
+
+
+def test_ingredient_search_is_keyed_by_name(api_client, ingredients):
+    Ingredient.objects.create(name='Соль', measurement_unit='г')
+    everything = api_client.get(INGREDIENTS_URL).json()
+    assert len(everything) == len(ingredients) + 1
+    found = api_client.get(INGREDIENTS_URL, {'name': 'сол'}).json()
+    assert [ingredient['name'] for ingredient in found] == ['Соль']
+
+
+def test_ingredient_cache_is_invalidated(api_client, ingredients):
+    etag = api_client.get(INGREDIENTS_URL)['ETag']
+    Ingredient.objects.create(name='Соль', measurement_unit='г')
+    response = api_client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.json()) == len(ingredients) + 1
+
+
+def test_ingredient_search_rejects_bad_limit(api_client, ingredients):
+    response = api_client.get(INGREDIENTS_URL, {'limit': 0})
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+def test_download_requires_authentication(api_client):
+    response = api_client.get(DOWNLOAD_URL)
+    assert response.status_code == 401
+    assert response['Content-Type'].startswith('text/plain')
+    assert response.content.decode() == (
+        'Учетные данные не были предоставлены.'
+    )
+
+
+def test_download_unknown_format(user_client):
+    response = user_client.get(DOWNLOAD_URL, {'format': 'pdf'})
+    assert response.status_code == 404
+    assert response['Content-Type'].startswith('text/plain')
+    assert response.content.decode() == 'Страница не найдена.'
+
+
+@pytest.mark.parametrize('file_format', ('txt', 'csv'))
+def test_download_shopping_list(user_client, user, make_recipe,
+                                file_format):
+    recipe = make_recipe()
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    response = user_client.get(DOWNLOAD_URL, {'format': file_format})
+    assert response.status_code == 200
+    assert 'Продукт 0' in b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.parametrize('accept, file_format', (
+    ('text/csv', 'csv'),
+    ('application/json', 'json'),
+    ('*/*', 'txt'),
+))
+def test_download_format_follows_accept(user_client, make_recipe, accept,
+                                        file_format):
+    recipe = make_recipe()
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    response = user_client.get(DOWNLOAD_URL, HTTP_ACCEPT=accept)
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith(
+        f'shopping_list.{file_format}"'
+    )
+    body = b''.join(response.streaming_content).decode()
+    if file_format == 'csv':
+        assert body.startswith('name,amount,measurement_unit')
+    if file_format == 'json':
+        assert body.startswith('[{')
@@ -0,0 +1,142 @@
+import pytest
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+pytestmark = pytest.mark.django_db
+
+
+def totals(user):
+    return dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'total_amount'
+    ))
+
+
+@pytest.fixture
+def admin_client(client, django_user_model):
+    admin = django_user_model.objects.create_superuser(
+        username='admin',
+        email='admin@example.com',
+        password='Kx7-pQ2-vL9-zR4',
+    )
+    client.force_login(admin)
+    return client
+
+
+def test_admin_adds_recipe_to_cart(admin_client, user, make_recipe):
+    recipe = make_recipe()
+    response = admin_client.post(
+        '/admin/recipes/shoppingcart/add/',
+        {'user': user.id, 'recipe': recipe.id},
+    )
+    assert response.status_code == 302
+    assert totals(user) == {
+        'Продукт 0': 100, 'Продукт 1': 100, 'Продукт 2': 100
+    }
+    assert ShoppingListItem.objects.find_inconsistencies(user) == []
+
+
+def test_orm_writes_keep_totals(user, author, make_recipe, ingredients):
+    first = make_recipe()
+    second = make_recipe(amounts={ingredients[0]: 50})
+    ShoppingCart.objects.create(user=user, recipe=first)
+    ShoppingCart.objects.create(user=user, recipe=second)
+    assert totals(user)['Продукт 0'] == 150
+
+    recipe_ingredient = RecipeIngredient.objects.get(
+        recipe=first, ingredient=ingredients[0]
+    )
+    recipe_ingredient.amount = 30
+    recipe_ingredient.save()
+    RecipeIngredient.objects.create(
+        recipe=second, ingredient=ingredients[5], amount=7
+    )
+    RecipeIngredient.objects.filter(
+        recipe=first, ingredient=ingredients[1]
+    ).delete()
+    assert totals(user) == {
+        'Продукт 0': 80, 'Продукт 2': 100, 'Продукт 5': 7
+    }
+
+    first.delete()
+    assert totals(user) == {'Продукт 0': 50, 'Продукт 5': 7}
+    ShoppingCart.objects.filter(user=user).delete()
+    assert totals(user) == {}
+    assert ShoppingListItem.objects.find_inconsistencies() == []
+
+
+def test_api_cart_changes_are_not_applied_twice(user_client, user,
+                                                make_recipe, ingredients):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/shopping_cart/'
+    assert user_client.post(url).status_code == 201
+    assert totals(user)['Продукт 0'] == 100
+    assert user_client.delete(url).status_code == 204
+    assert totals(user) == {}
+    user_client.post(url)
+    user_client.delete('/api/recipes/shopping_cart/clear/')
+    assert totals(user) == {}
+    assert ShoppingListItem.objects.find_inconsistencies() == []
+
+
+def test_api_recipe_changes_are_not_applied_twice(user, author, make_recipe,
+                                                  ingredients):
+    client = APIClient()
+    client.force_authenticate(author)
+    recipe = make_recipe()
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    response = client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {'ingredients': [
+            {'id': ingredients[0].id, 'amount': 20},
+            {'id': ingredients[4].id, 'amount': 5},
+        ]},
+        format='json',
+    )
+    assert response.status_code == 200
+    assert totals(user) == {'Продукт 0': 20, 'Продукт 4': 5}
+    assert client.delete(f'/api/recipes/{recipe.id}/').status_code == 204
+    assert totals(user) == {}
+
+
+def test_author_deletion_cascades_into_totals(user, author, make_recipe,
+                                              django_user_model,
+                                              ingredients):
+    other_author = django_user_model.objects.create_user(
+        username='other', email='other@example.com',
+        password='Kx7-pQ2-vL9-zR4',
+    )
+    ShoppingCart.objects.create(user=user, recipe=make_recipe())
+    ShoppingCart.objects.create(user=user, recipe=make_recipe(
+        amounts={ingredients[0]: 5}, recipe_author=other_author,
+    ))
+    author.delete()
+    assert totals(user) == {'Продукт 0': 5}
+    assert ShoppingListItem.objects.find_inconsistencies() == []
+
+
+def test_rolled_back_recipe_deletion_leaves_no_state(user, make_recipe):
+    recipe = make_recipe()
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            recipe.delete()
+            raise RuntimeError
+    assert totals(user)['Продукт 0'] == 100
+    ShoppingCart.objects.filter(user=user).delete()
+    assert totals(user) == {}
+
+
+def test_apply_delta_adds_to_existing_and_new_rows(user, ingredients):
+    ShoppingListItem.objects.apply_delta(
+        [user.id], {ingredients[0].id: 3}
+    )
+    ShoppingListItem.objects.apply_delta(
+        [user.id], {ingredients[0].id: 4, ingredients[1].id: 2}
+    )
+    assert totals(user) == {'Продукт 0': 7, 'Продукт 1': 2}
+    ShoppingListItem.objects.apply_delta(
+        [user.id], {ingredients[0].id: -10, ingredients[2].id: -1}
+    )
+    assert totals(user) == {'Продукт 1': 2}
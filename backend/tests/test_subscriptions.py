@@ -0,0 +1,31 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+def test_subscriptions_empty(user_client):
+    response = user_client.get(SUBSCRIPTIONS_URL)
+    assert response.status_code == 200
+    assert response.json()['count'] == 0
+    assert response.json()['results'] == []
+
+
+def test_subscriptions_page_past_the_end(user_client, user, author):
+    user.subscriber.create(author=author)
+    response = user_client.get(SUBSCRIPTIONS_URL, {'page': 2})
+    assert response.status_code == 404
+
+
+def test_subscriptions_latest_recipes(user_client, user, author,
+                                      make_recipe):
+    recipes = [make_recipe(name=f'Рецепт {number}') for number in range(3)]
+    user.subscriber.create(author=author)
+    response = user_client.get(SUBSCRIPTIONS_URL, {'recipes_limit': 2})
+    assert response.status_code == 200
+    [subscription] = response.json()['results']
+    assert subscription['recipes_count'] == 3
+    assert [recipe['id'] for recipe in subscription['recipes']] == [
+        recipes[2].id, recipes[1].id
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import UniqueConstraint
 
+from backend.counters import CounterFieldsMixin
+
 
 class UserRole:
     USER = 'user'
@@ -13,9 +15,11 @@ class UserRole:
     ]
 
 
-class MyUser(AbstractUser):
+class MyUser(CounterFieldsMixin, AbstractUser):
     """Модель пользователя."""
 
+    counter_fields = ('recipes_count', 'subscribers_count')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -51,6 +55,22 @@ class MyUser(AbstractUser):
         help_text='Добавте фото вашего профиля.',
         upload_to='profile_images',
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото профиля',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
     role = models.TextField(
         choices=UserRole.choices,
         default=UserRole.USER,